@@ -1,71 +1,147 @@
+import argparse
 import re
 import requests
-from bs4 import BeautifulSoup
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from pprint import pprint as pp
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from threading import Lock
 import time
+import tracemalloc
+import finvizScreener
+import httpCache
+import parsePool
+import pipeline
+import streamExtract
+from metrics import metrics
+from records import TickerRecord
+from checkpoint import CheckpointJournal
+from historyStore import HistoryStore
+from scrapeDigrin import get_digrin_data
+from sheetsGateway import get_gateway, getTickers
+from sinks import SheetsSink, StdoutSink
+
+FINVIZ_QUOTE_URL = 'https://finviz.com/quote.ashx?t={ticker}'
+FINVIZ_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
+
+# Maximum number of simultaneous requests per host
+FINVIZ_MAX_WORKERS = 8
+DIGRIN_MAX_WORKERS = 2
+# Only send changed cells to Google Sheets
+INCREMENTAL_SHEETS_WRITE = True
+# Stream tickers through Finviz, Digrin and the sheet instead of fetching everything first
+STREAMING_PIPELINE = True
+# Rows written to the sheet at once in streaming mode
+SHEETS_CHUNK_SIZE = 50
+# Append every merged record to the local history database
+RECORD_HISTORY = True
+# Journal every finished ticker, so an interrupted run can continue with --resume
+CHECKPOINT_RUNS = True
+# Read quote data for SCREENER_CHUNK_SIZE tickers per Finviz screener request, and only
+# download the quote page of tickers the screener does not fully cover. 'EPS next Y' and
+# 'Dividend' are then estimated from screener columns, see finvizScreener.screener_snapshot.
+BULK_SCREENER = False
+# Snapshot labels extract_financial_info needs from the screener before it skips the quote page
+SCREENER_REQUIRED_LABELS = ['Price', 'EPS (ttm)', 'EPS next Y', 'P/E', 'Forward P/E', 'Dividend',
+                            'Dividend %', 'Market Cap', 'Sales Q/Q', 'Shs Outstand']
+# Every snapshot label extract_financial_info reads
+SNAPSHOT_LABELS = SCREENER_REQUIRED_LABELS + ['ROE']
+# Read quote pages in chunks and stop after the snapshot table, instead of downloading them through the cache
+STREAM_PAGES = False
+
+# 'fast' only builds the snapshot table cells, using lxml when it is installed
+# 'full' parses the whole page with html.parser
+PARSER_MODE = 'fast'
+FAST_PARSER = 'lxml' if find_spec('lxml') else 'html.parser'
+# SoupStrainer compares the whole class attribute, so match snapshot-td2 as one of several classes
+SNAPSHOT_STRAINER = SoupStrainer('td', class_=re.compile(r'(?:^|\s)snapshot-td2(?:\s|$)'))
+# Print parse time and peak memory for every Finviz page
+REPORT_PARSE_STATS = False
+# tracemalloc is process wide, so measured parses run one at a time
+parse_stats_lock = Lock()
+# Run report files written at the end of main, None to skip
+METRICS_JSON = 'run_report.json'
+METRICS_PROMETHEUS = 'metrics.prom'
 
 
 def fetch_financial_info(ticker):
     # Define the Finviz URL
-    url = f'https://finviz.com/quote.ashx?t={ticker}'
+    url = FINVIZ_QUOTE_URL.format(ticker=ticker)
 
     try:
+        if STREAM_PAGES:
+            snapshot = streamExtract.stream_extract(
+                url, streamExtract.SnapshotStreamParser(SNAPSHOT_LABELS), FINVIZ_HEADERS).snapshot
+            return extract_financial_info(ticker, snapshot)
+
         # Send HTTP request with a custom User-Agent header
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-
-        # Parse HTML content
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Extract general financial information
-        stock_price = get_valueFinviz(soup, 'Price')
-        eps = safe_float_convert(get_valueFinviz(soup, 'EPS (ttm)'))
-        EPS_forward = safe_float_convert(get_valueFinviz(soup, 'EPS next Y'))
-        PE_ratio = safe_float_convert(get_valueFinviz(soup, 'P/E'))
-        forwardPE = safe_float_convert(get_valueFinviz(soup, 'Forward P/E'))
-        dividend_annual = get_valueFinviz(soup, 'Dividend')
-        dividend_payout = calculate_payout_ratio(soup)
-        dividend_yield = get_valueFinviz(soup, 'Dividend %')
-        if dividend_yield == "N/A":
-            dividend_yield = 0
-
-        market_cap = int(safe_float_convert(
-            get_numeric_value(soup, 'Market Cap')))
-        sales_growth_rate_5y = get_valueFinviz(
-            soup, 'Sales Q/Q')  # NAKIJKEN <--
-        return_on_equity = get_valueFinviz(soup, 'ROE')
-        shares_outstanding = int(get_numeric_value(soup, 'Shs Outstand'))
-        fair_value = round(calculate_discounted_cash_flow(
-            ticker, market_cap, eps, EPS_forward, dividend_yield, sales_growth_rate_5y, stock_price), 2)
-        price_difference = calculate_difference(fair_value, stock_price)
+        page = httpCache.fetch(url, headers=FINVIZ_HEADERS)
 
-        response.close()
-
-        financial_info = {
-            'Ticker': ticker,
-            'Stock Price': stock_price,
-            'Dividend (Annual)': dividend_annual,
-            'Dividend Yield': dividend_yield,
-            'Dividend Payout Ratio': dividend_payout,
-            'Fair Value': fair_value,
-            'Price Difference': price_difference,
-            'EPS (ttm)': eps,
-            'P/E': PE_ratio,
-            'Forward P/E': forwardPE,
-            'Shares Outstanding': shares_outstanding
-        }
+        # Parse HTML content and read the snapshot table once, unless this exact page was parsed before
+        snapshot = page.get_parsed(
+            'finviz-snapshot', lambda text: parsePool.run_parser(parse_finviz_page, ticker, text))
 
-        return financial_info
+        return extract_financial_info(ticker, snapshot)
 
     except requests.RequestException as e:
+        metrics.increment('failures', source='finviz')
         print(f"Error: Unable to fetch data for {ticker}. {e}")
         return None
 
 
+def extract_financial_info(ticker, snapshot):
+    """
+    Build the Finviz part of a ticker's record from its snapshot values.
+
+    Parameters:
+    - ticker (str): Ticker symbol.
+    - snapshot (dict): Snapshot label mapped to the raw value text, from a quote page or the screener.
+
+    Returns:
+    - TickerRecord: The record, with the Digrin fields still missing.
+    """
+    # Extract general financial information
+    stock_price = get_valueFinviz(snapshot, 'Price')
+    eps = safe_float_convert(get_valueFinviz(snapshot, 'EPS (ttm)'))
+    EPS_forward = safe_float_convert(get_valueFinviz(snapshot, 'EPS next Y'))
+    PE_ratio = safe_float_convert(get_valueFinviz(snapshot, 'P/E'))
+    forwardPE = safe_float_convert(get_valueFinviz(snapshot, 'Forward P/E'))
+    dividend_annual = get_valueFinviz(snapshot, 'Dividend')
+    dividend_payout = calculate_payout_ratio(snapshot)
+    dividend_yield = get_valueFinviz(snapshot, 'Dividend %')
+    if dividend_yield == "N/A":
+        dividend_yield = 0
+
+    market_cap = int(safe_float_convert(
+        get_numeric_value(snapshot, 'Market Cap')))
+    sales_growth_rate_5y = get_valueFinviz(
+        snapshot, 'Sales Q/Q')  # NAKIJKEN <--
+    return_on_equity = get_valueFinviz(snapshot, 'ROE')
+    shares_outstanding = int(get_numeric_value(snapshot, 'Shs Outstand'))
+    with metrics.timer('valuation', source='finviz'):
+        fair_value = round(calculate_discounted_cash_flow(
+            ticker, market_cap, eps, EPS_forward, dividend_yield, sales_growth_rate_5y, stock_price), 2)
+        price_difference = calculate_difference(fair_value, stock_price)
+
+    # Missing values ('N/A' and error messages) become NaN
+    financial_info = TickerRecord(
+        ticker,
+        stock_price=stock_price,
+        dividend_annual=dividend_annual,
+        dividend_yield=dividend_yield,
+        dividend_payout_ratio=dividend_payout,
+        fair_value=fair_value,
+        price_difference=price_difference,
+        eps_ttm=eps,
+        pe_ratio=PE_ratio,
+        forward_pe=forwardPE,
+        shares_outstanding=shares_outstanding
+    )
+
+    return financial_info
+
+
 def calculate_discounted_cash_flow(ticker, market_cap, earnings_per_share, forward_earnings_per_share, dividend_yield, sales_growth_rate_5y, current_price):
     # Calculate Dividends per Share
     dividends_per_share = 0
@@ -103,12 +179,64 @@ def safe_float_convert(str):
         return str
 
 
-def get_valueFinviz(start_tag, label):
-    label_element = start_tag.find('td', class_='snapshot-td2', string=label)
-    if label_element:
-        value_element = label_element.find_next('td', class_='snapshot-td2')
-        if value_element:
-            value_text = value_element.get_text(strip=True)
+def parse_finviz_page(ticker, html, mode=None):
+    """
+    Parse a Finviz quote page and return its snapshot table as a label to value map.
+
+    Parameters:
+    - ticker (str): Ticker symbol, used in the parse report.
+    - html (str): Raw HTML of the quote page.
+    - mode (str): 'fast' or 'full'. Defaults to PARSER_MODE.
+
+    Returns:
+    - dict: The snapshot index built by build_snapshot_index.
+    """
+    if (mode or PARSER_MODE) == 'fast':
+        features, parse_only = FAST_PARSER, SNAPSHOT_STRAINER
+    else:
+        features, parse_only = 'html.parser', None
+
+    if not REPORT_PARSE_STATS:
+        with metrics.timer('parse', source='finviz'):
+            return build_snapshot_index(BeautifulSoup(html, features, parse_only=parse_only))
+
+    with parse_stats_lock:
+        tracemalloc.start()
+        start = time.perf_counter()
+        snapshot = build_snapshot_index(
+            BeautifulSoup(html, features, parse_only=parse_only))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    metrics.observe('parse', elapsed, source='finviz')
+    print(f"Parsed {ticker} with {features}{' (snapshot only)' if parse_only else ''}"
+          f" in {elapsed * 1000:.1f} ms, peak memory {peak / 1024:.0f} KiB")
+    return snapshot
+
+
+def build_snapshot_index(soup):
+    """
+    Walk the Finviz snapshot table once and map every label to the text of the cell after it.
+
+    Parameters:
+    - soup (BeautifulSoup): Parsed Finviz quote page.
+
+    Returns:
+    - dict: Label text mapped to the raw value text. The first occurrence of a label wins.
+    """
+    snapshot = {}
+    cells = soup.find_all('td', class_='snapshot-td2')
+    for index, cell in enumerate(cells[:-1]):
+        label = cell.string
+        if label is not None and label not in snapshot:
+            snapshot[str(label)] = cells[index + 1].get_text(strip=True)
+    return snapshot
+
+
+def get_valueFinviz(snapshot, label):
+    with metrics.timer('extract_field', source='finviz', field=label):
+        value_text = snapshot.get(label)
+        if value_text is not None:
             if '%' in value_text:
                 value = value_text.replace('%', '')
                 try:
@@ -120,20 +248,18 @@ def get_valueFinviz(start_tag, label):
                     return round(float(value_text), 2)
                 except ValueError:
                     return 'N/A'
-    return 'N/A'
+        return 'N/A'
 
 
-def get_numeric_value(start_tag, label):
-    label_element = start_tag.find('td', class_='snapshot-td2', string=label)
-    if label_element:
-        value_element = label_element.find_next('td', class_='snapshot-td2')
-        if value_element:
-            numeric_value = value_element.get_text(strip=True)
+def get_numeric_value(snapshot, label):
+    with metrics.timer('extract_field', source='finviz', field=label):
+        numeric_value = snapshot.get(label)
+        if numeric_value is not None:
             # Convert abbreviations to numbers
             numeric_value = convert_abbreviations(numeric_value)
             # Check if the numeric value is valid
             return numeric_value if isinstance(numeric_value, (int, float)) else 'N/A'
-    return 'N/A'
+        return 'N/A'
 
 
 def convert_abbreviations(value):
@@ -149,9 +275,9 @@ def convert_abbreviations(value):
     return value
 
 
-def calculate_payout_ratio(soup):
-    dividend_in_usd = str(get_valueFinviz(soup, 'Dividend'))
-    eps_next_y = str(get_valueFinviz(soup, 'EPS next Y'))
+def calculate_payout_ratio(snapshot):
+    dividend_in_usd = str(get_valueFinviz(snapshot, 'Dividend'))
+    eps_next_y = str(get_valueFinviz(snapshot, 'EPS next Y'))
 
     if dividend_in_usd != 'N/A' and eps_next_y != 'N/A' and float(eps_next_y) != 0:
         payout_ratio = (float(dividend_in_usd.replace(
@@ -161,209 +287,191 @@ def calculate_payout_ratio(soup):
     return 'N/A'
 
 
-def write_financial_data_to_google_sheets(data_list, spreadsheet_name, sheet_name):
+def fetch_concurrently(tickers, fetch_function, max_workers):
     """
-    Write a list of key-value pairs for multiple tickers to a Google Sheets spreadsheet.
+    Call fetch_function for every ticker using a pool of worker threads.
 
     Parameters:
-    - data_list (list of dictionaries): List containing dictionaries of financial data for each ticker.
-    - spreadsheet_name (str): Name of the Google Sheets spreadsheet.
-    - sheet_name (str): Name of the sheet within the spreadsheet.
+    - tickers (list of str): Ticker symbols to fetch.
+    - fetch_function (callable): Function taking a ticker and returning its data or None.
+    - max_workers (int): Maximum number of requests in flight at once. Use 1 for sequential fetching.
 
     Returns:
-    - None
+    - list: The results of fetch_function, in the same order as tickers.
     """
-    # Set up credentials
-    scope = ["https://spreadsheets.google.com/feeds",
-             "https://www.googleapis.com/auth/drive"]
-    credentials = ServiceAccountCredentials.from_json_keyfile_name(
-        'key.json', scope)
-    gc = gspread.authorize(credentials)
-
-    # Open the spreadsheet
-    try:
-        spreadsheet = gc.open(spreadsheet_name)
-    except gspread.SpreadsheetNotFound:
-        # If the spreadsheet does not exist, create a new one
-        spreadsheet = gc.create(spreadsheet_name)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(fetch_function, tickers))
 
-    # Select or create the sheet
-    try:
-        worksheet = spreadsheet.worksheet(sheet_name)
-    except gspread.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(sheet_name, 1, len(data_list[0]))
 
-    # Write data to the sheet
-    headers = list(data_list[0].keys())
+def iter_screener_items(tickers):
+    """
+    Read the tickers through the Finviz screener, SCREENER_CHUNK_SIZE tickers per request.
 
-    # Make sure the header row exists
-    if worksheet.row_values(1) != headers:
-        worksheet.update('A1', [headers])
+    Yields, in ticker order, a TickerRecord for every ticker the screener supplies all
+    SCREENER_REQUIRED_LABELS for, and the ticker itself for the rest, to be fetched from its quote page.
+    """
+    for chunk in finvizScreener.chunk_tickers(tickers):
+        snapshots = finvizScreener.fetch_screener_snapshots(chunk, headers=FINVIZ_HEADERS)
+        for ticker in chunk:
+            snapshot = snapshots.get(ticker.upper())
+            if snapshot is not None and all(label in snapshot for label in SCREENER_REQUIRED_LABELS):
+                try:
+                    record = extract_financial_info(ticker, snapshot)
+                except (TypeError, ValueError):
+                    pass
+                else:
+                    yield record
+                    continue
+            metrics.increment('screener_fallbacks')
+            yield ticker
 
-    # Create a list of lists for the new data
-    new_data_values = [[ticker_data[header]
-                        for header in headers] for ticker_data in data_list]
 
-    # Get the range of cells to update
-    # Assuming data starts from the second row (excluding headers)
-    start_cell = f'A2'
-    # End cell based on number of columns
-    end_cell = f'{chr(ord("A") + len(headers) - 1)}{len(new_data_values) + 1}'
+def resolve_financial_info(item):
+    # Screener results are complete already, plain tickers still need their quote page
+    if isinstance(item, TickerRecord):
+        return item
+    return fetch_financial_info(item)
 
-    # Update the entire range with the new data
-    worksheet.update(f'{start_cell}:{end_cell}', new_data_values)
-    gc.session.close()
 
+def iter_ingestion_items(tickers, journaled):
+    """
+    Yield, in ticker order, the input of the Finviz stage: a record journaled by a previous run,
+    a screener record, or a ticker whose quote page still has to be fetched.
+    """
+    pending = [ticker for ticker in tickers if ticker not in journaled]
+    fetched = iter(iter_screener_items(pending) if BULK_SCREENER else pending)
+    for ticker in tickers:
+        yield journaled[ticker] if ticker in journaled else next(fetched)
 
-def fetch_digrin_data(ticker):
-    url = f'https://www.digrin.com/stocks/detail/{ticker}'
 
-    try:
-        # Send HTTP request with a custom User-Agent header
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-
-        # Parse HTML content
-        soup2 = BeautifulSoup(response.text, 'html.parser')
-
-        dgr3 = get_valueDigrin(soup2, 'DGR3')
-        dgr5 = get_valueDigrin(soup2, 'DGR5')
-        dgr10 = get_valueDigrin(soup2, 'DGR10')
-        dgr20 = get_valueDigrin(soup2, 'DGR20')
-        divYears = get_valueDigrin(soup2, 'Years Paying Dividends')
-
-        response.close()
-
-        return {
-            'DGR3': dgr3,
-            'DGR5': dgr5,
-            'DGR10': dgr10,
-            'DGR20': dgr20,
-            'Years Paying Dividends': divYears
-        }
-    except requests.RequestException as e:
-        print(f"Error: Unable to fetch Digrin data for {ticker}. {e}")
-        return None
+def journaled_stages(journal, completed=None):
+    """
+    Return the journaled records, the completed ones among them, and the Finviz and Digrin
+    stage functions of a run.
 
+    Records the journal has as done pass through both stages untouched, records that only miss
+    their Digrin data skip the Finviz stage. Every finished ticker is journaled.
+    completed can pass in journal.completed() when the caller built it already.
+    """
+    if completed is None:
+        completed = journal.completed() if journal else {}
+    journaled = dict(journal.missing_digrin(), **completed) if journal else {}
+
+    def fetch(item):
+        financial_info = resolve_financial_info(item)
+        if financial_info is None and journal:
+            journal.record_failed(item, 'finviz')
+        return financial_info
 
-def get_valueDigrin(soup2, label):
-    pattern = re.compile(fr'{label}.*?>(.*?)<\/strong>', re.DOTALL)
-    match = pattern.search(str(soup2))
-    if match:
-        return match.group(1).strip().replace('<strong>', '').replace('</strong>', '')
-    return 'N/A'
+    def merge(financial_info):
+        if financial_info is completed.get(financial_info.ticker):
+            return financial_info
+        return merge_digrin_data(financial_info, journal)
 
+    return journaled, completed, fetch, merge
 
-def extract_percentage(element):
-    text = element.get_text(strip=True).replace('%', '').replace(',', '')
-    return round(float(text) / 100, 4) if text.replace('.', '').isdigit() else None
 
+def fetched_records(records, completed):
+    # Records finished by the interrupted run were stored in the history by that run
+    return [record for record in records if record is not completed.get(record.ticker)]
 
-def get_digrin_data(ticker_symbol):
-    stock_url = 'https://www.digrin.com/stocks/detail/' + str(ticker_symbol)
-    try:
-        # Fetch the HTML content
-        response = requests.get(stock_url)
-        response.raise_for_status()
-
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Extract DGR3, DGR5, DGR10, and "Years Paying Dividends" values
-        dgr_elements = soup.find_all('p')
-
-        dgr3 = next((extract_percentage(dgr.find('strong'))
-                    for dgr in dgr_elements if 'DGR3' in dgr.text), None)
-        dgr5 = next((extract_percentage(dgr.find('strong'))
-                    for dgr in dgr_elements if 'DGR5' in dgr.text), None)
-        dgr10 = next((extract_percentage(dgr.find('strong'))
-                     for dgr in dgr_elements if 'DGR10' in dgr.text), None)
-        dgr20 = next((extract_percentage(dgr.find('strong'))
-                     for dgr in dgr_elements if 'DGR20' in dgr.text), None)
-
-        years_paying_dividends_elem = next((dgr.find(
-            'strong').text for dgr in dgr_elements if 'Years Paying Dividends' in dgr.text), None)
-        years_paying_dividends = int(
-            years_paying_dividends_elem) if years_paying_dividends_elem else None
-
-        return {'DGR3': dgr3, 'DGR5': dgr5, 'DGR10': dgr10, 'DGR20': dgr20, 'Years Paying Dividends': years_paying_dividends}
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data: {e}")
-        return None
-    except (ValueError, TypeError) as e:
-        print(f"Error processing data: {e}")
-        return None
 
+def merge_digrin_data(financial_info, journal=None):
+    digrin_data = get_digrin_data(str(financial_info.ticker).upper())
+    if digrin_data is not None:
+        financial_info.merge_digrin(digrin_data)
+        if journal:
+            journal.record_done(financial_info)
+    else:
+        print("???")  # <------ Hier naar kijken
+        if journal:
+            journal.record_failed(financial_info.ticker, 'digrin', financial_info)
+    return financial_info
 
-def getTickers():
-    # Set up credentials (replace 'path/to/credentials.json' with your JSON file)
-    scope = ["https://spreadsheets.google.com/feeds",
-             "https://www.googleapis.com/auth/drive"]
-    credentials = ServiceAccountCredentials.from_json_keyfile_name(
-        'key.json', scope)
-    gc = gspread.authorize(credentials)
 
-    spreadsheet_name = 'Dividend aandelen Aankopen'
-    sheet_name = 'IntermediateTable'
+def run_batch(tickers, sinks, history=None, journal=None, completed=None):
+    journaled, completed, fetch, merge = journaled_stages(journal, completed)
 
-    # Open the spreadsheet
-    try:
-        spreadsheet = gc.open(spreadsheet_name)
-    except gspread.SpreadsheetNotFound:
-        # If the spreadsheet does not exist, create a new one
-        spreadsheet = gc.create(spreadsheet_name)
+    # Fetch financial information for all tickers in parallel
+    items = list(iter_ingestion_items(tickers, journaled))
+    financial_data_list = [financial_info for financial_info in fetch_concurrently(
+        items, fetch, FINVIZ_MAX_WORKERS) if financial_info]
 
-    # Select or create the sheet
-    try:
-        worksheet = spreadsheet.worksheet(sheet_name)
-    except gspread.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(sheet_name, 1, 1)
+    financial_data_list2 = fetch_concurrently(financial_data_list, merge, DIGRIN_MAX_WORKERS)
+
+    if history:
+        history.append(fetched_records(financial_data_list2, completed))
+    for sink in sinks:
+        sink.write(financial_data_list2)
+
+
+def run_streaming(tickers, sinks, history=None, journal=None, completed=None):
+    """
+    Fetch Finviz data, then Digrin data, and write every chunk of SHEETS_CHUNK_SIZE rows to the sinks as soon as it is complete.
+    """
+    journaled, completed, fetch, merge = journaled_stages(journal, completed)
+    scraped_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    def write_chunk(rows):
+        if history:
+            history.append(fetched_records(rows, completed), scraped_at)
+        for sink in sinks:
+            sink.write(rows)
 
-    # Get values from the first column (excluding the first row)
-    column_values = worksheet.col_values(1)[1:]
-    gc.session.close()
-    return column_values
+    # The screener requests run in the pipeline's source, ahead of the quote page workers
+    pipeline.run_pipeline(iter_ingestion_items(tickers, journaled), [
+        (fetch, FINVIZ_MAX_WORKERS),
+        (merge, DIGRIN_MAX_WORKERS),
+    ], write_chunk, chunk_size=SHEETS_CHUNK_SIZE)
 
 
-def main():
+def run(tickers, sinks, resume=False):
+    """
+    Scrape Finviz and Digrin data of the tickers into every sink, then close the sinks.
+
+    Parameters:
+    - tickers (list of str): Ticker symbols.
+    - sinks (list): Output sinks from the sinks module.
+    - resume (bool): Continue the previous run from its checkpoint journal: tickers it finished
+      are not fetched again, failed and missing ones are.
+    """
+    history = HistoryStore() if RECORD_HISTORY else None
+    journal = CheckpointJournal(resume=resume) if CHECKPOINT_RUNS or resume else None
+    # Built once, every call rebuilds the records of the whole journal
+    completed = journal.completed() if journal else {}
+    if resume:
+        done = sum(ticker in completed for ticker in tickers)
+        print(f"Resuming: {done} of {len(tickers)} tickers already done")
+    if STREAMING_PIPELINE:
+        run_streaming(tickers, sinks, history, journal, completed)
+    else:
+        run_batch(tickers, sinks, history, journal, completed)
+    for sink in sinks:
+        sink.close()
+    parsePool.shutdown()
+    if history:
+        history.close()
+    if journal:
+        journal.close()
+    metrics.write_report(METRICS_JSON, METRICS_PROMETHEUS)
+
+
+def main(resume=False):
+    """
+    Scrape every ticker of the sheet and write the results back. See run for resume.
+    """
+    # One authorized connection for reading the tickers and writing the results
+    gateway = get_gateway()
+
     tickers = ['ABBV', 'ADM']
-    tickers = getTickers()  # Get Latest Ticker list from Google Sheets
+    tickers = getTickers(gateway)  # Get Latest Ticker list from Google Sheets
 
-    financial_data_list = []
-    # Iterate over each ticker
-    for ticker in tickers:
-        # Fetch financial information
-        financial_info = []
-        financial_info = fetch_financial_info(ticker)
-        if financial_info:
-            financial_data_list.append(financial_info)
-
-    financial_data_list2 = []
-    for ticker in financial_data_list:
-        ticker_symbol = ""
-        ticker_symbol = str(ticker['Ticker'])
-        data = []
-        time.sleep(2)
-        digrin_data = get_digrin_data(ticker_symbol.upper())
-        if digrin_data is not None:
-            data = digrin_data
-        else:
-            print("???")  # <------ Hier naar kijken
-
-        ticker.update(data)
-        financial_data_list2.append(ticker)
-
-    for ticker_row in financial_data_list2:
-        pp(ticker_row)
-
-    spreadsheet_name = 'Dividend aandelen Aankopen'
-    sheet_name = 'IntermediateTable'
-    write_financial_data_to_google_sheets(
-        financial_data_list2, spreadsheet_name, sheet_name)
+    run(tickers, [StdoutSink(), SheetsSink(gateway=gateway, incremental=INCREMENTAL_SHEETS_WRITE)], resume)
+    gateway.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Scrape Finviz and Digrin data for the tickers in Google Sheets.')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip tickers the interrupted previous run finished and retry the rest')
+    main(parser.parse_args().resume)
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+# Every ticker is served one of these pages, chosen by a stable hash of the ticker
+FIXTURE_NAMES = ['dividend', 'no_dividend', 'missing_fields']
+
+
+def load_fixtures(source):
+    fixtures = []
+    for name in FIXTURE_NAMES:
+        with open(os.path.join(FIXTURE_DIR, source, name + '.html'), 'rb') as file:
+            fixtures.append(file.read())
+    return fixtures
+
+
+def fixture_name(ticker):
+    return FIXTURE_NAMES[zlib.crc32(ticker.encode('utf-8')) % len(FIXTURE_NAMES)]
+
+
+class FixtureServer:
+    """
+    Local HTTP server that replays the recorded Finviz and Digrin pages.
+
+    /quote.ashx?t=TICKER serves a Finviz page and /stocks/detail/TICKER a Digrin page.
+    Every response waits latency seconds (plus up to jitter seconds more), and a share
+    error_rate of the requests gets a 503 instead. Statuses queued with queue_responses
+    are sent before any page. With etags, pages carry an ETag and a matching
+    If-None-Match gets a 304.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, port=0, etags=False):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.etags = etags
+        self.queued = []
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        finviz_pages = load_fixtures('finviz')
+        digrin_pages = load_fixtures('digrin')
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/quote.ashx':
+                    ticker = parse_qs(url.query).get('t', [''])[0]
+                    pages = finviz_pages
+                elif url.path.startswith('/stocks/detail/'):
+                    ticker = url.path.rsplit('/', 1)[-1]
+                    pages = digrin_pages
+                else:
+                    self.send_error(404)
+                    return
+
+                delay = server.latency + random.uniform(0, server.jitter)
+                if delay:
+                    time.sleep(delay)
+                with server.lock:
+                    queued = server.queued.pop(0) if server.queued else None
+                    if queued:
+                        server.requests += 1
+                        server.errors += 1
+                if queued:
+                    status, headers = queued
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if random.random() < server.error_rate:
+                    with server.lock:
+                        server.requests += 1
+                        server.errors += 1
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                body = pages[FIXTURE_NAMES.index(fixture_name(ticker))]
+                etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                if server.etags and self.headers.get('If-None-Match') == etag:
+                    with server.lock:
+                        server.requests += 1
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                with server.lock:
+                    server.requests += 1
+                    server.bytes_sent += len(body)
+                self.send_response(200)
+                if server.etags:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def queue_responses(self, *statuses, headers=None):
+        """
+        Answer the next requests with these statuses and headers, one per request, without a body.
+        """
+        with self.lock:
+            self.queued.extend((status, dict(headers or {})) for status in statuses)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == '__main__':
+    server = FixtureServer().start()
+    print(f'Serving fixtures on {server.base_url}')
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,144 @@
+"""
+Offline benchmarks for the Finviz and Digrin scrapers.
+
+Parsing is measured directly on the recorded pages in benchmarks/fixtures. The end-to-end
+run streams a synthetic ticker list through fetch_financial_info and merge_digrin_data,
+against a local FixtureServer instead of the real sites.
+
+    python benchmarks/runBenchmarks.py --sizes 10,100,1000 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+# Make the scraper modules in the repository root importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpCache  # noqa: E402
+import MainScraper  # noqa: E402
+import parsePool  # noqa: E402
+import pipeline  # noqa: E402
+import scrapeDigrin  # noqa: E402
+import streamExtract  # noqa: E402
+from fixtureServer import FIXTURE_NAMES, FixtureServer, load_fixtures  # noqa: E402
+from metrics import metrics  # noqa: E402
+
+
+def peak_memory(function, *args):
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def downloaded_bytes():
+    # Bytes the client actually read; a streamed page stops early even though the server sent all of it
+    return sum(value for (name, _), value in metrics.counters.items() if name == 'bytes_downloaded')
+
+
+def stream_parse(page):
+    # Feed the page the way stream_extract receives it, stopping once the snapshot is complete
+    parser = streamExtract.SnapshotStreamParser(MainScraper.SNAPSHOT_LABELS)
+    for start in range(0, len(page), streamExtract.CHUNK_SIZE):
+        parser.feed(page[start:start + streamExtract.CHUNK_SIZE])
+        if parser.done:
+            break
+    return parser.snapshot
+
+
+def bench_parsing(iterations):
+    finviz_pages = [page.decode('utf-8') for page in load_fixtures('finviz')]
+    digrin_pages = [page.decode('utf-8') for page in load_fixtures('digrin')]
+
+    cases = [(f'finviz {mode}', lambda page, mode=mode: MainScraper.parse_finviz_page('X', page, mode), finviz_pages)
+             for mode in ('full', 'fast')]
+    cases.append(('finviz stream', stream_parse, finviz_pages))
+    cases.append(('digrin', scrapeDigrin.extract_digrin_values, digrin_pages))
+
+    print(f'Parsing ({iterations} passes over {len(FIXTURE_NAMES)} pages, fast parser: {MainScraper.FAST_PARSER})')
+    print(f'{"case":<14}{"pages/s":>12}{"ms/page":>10}{"peak KiB":>10}')
+    for name, parse, pages in cases:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for page in pages:
+                parse(page)
+        elapsed = time.perf_counter() - start
+        count = iterations * len(pages)
+        peak = max(peak_memory(parse, page) for page in pages)
+        print(f'{name:<14}{count / elapsed:>12.1f}{elapsed / count * 1000:>10.2f}{peak / 1024:>10.0f}')
+
+
+def bench_end_to_end(sizes, server, finviz_workers, digrin_workers, trace_memory):
+    # Point the fetchers at the local server, without cache. The local host has no rate limit.
+    MainScraper.FINVIZ_QUOTE_URL = server.base_url + '/quote.ashx?t={ticker}'
+    scrapeDigrin.DIGRIN_DETAIL_URL = server.base_url + '/stocks/detail/{ticker}'
+    httpCache.CACHE_ENABLED = False
+
+    print(f'End to end (latency {server.latency}s, error rate {server.error_rate:.1%}, '
+          f'{finviz_workers} Finviz / {digrin_workers} Digrin workers, {parsePool.PARSE_PROCESSES} parse processes'
+          f'{", streaming" if MainScraper.STREAM_PAGES else ""})')
+    print(f'{"tickers":>8}{"rows":>8}{"seconds":>10}{"tickers/s":>11}{"MiB read":>10}{"peak MiB":>10}')
+    for size in sizes:
+        tickers = [f'T{number:05d}' for number in range(size)]
+        rows = [0]
+
+        def sink(chunk):
+            rows[0] += len(chunk)
+
+        bytes_before = downloaded_bytes()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        pipeline.run_pipeline(tickers, [
+            (MainScraper.fetch_financial_info, finviz_workers),
+            (MainScraper.merge_digrin_data, digrin_workers),
+        ], sink)
+        elapsed = time.perf_counter() - start
+        peak = 'n/a'
+        if trace_memory:
+            peak = f'{tracemalloc.get_traced_memory()[1] / 2 ** 20:.1f}'
+            tracemalloc.stop()
+        downloaded = (downloaded_bytes() - bytes_before) / 2 ** 20
+        print(f'{size:>8}{rows[0]:>8}{elapsed:>10.2f}{size / elapsed:>11.1f}{downloaded:>10.1f}{peak:>10}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,100,1000,10000',
+                        help='comma separated universe sizes for the end-to-end run')
+    parser.add_argument('--iterations', type=int, default=50, help='parsing passes over the fixtures')
+    parser.add_argument('--latency', type=float, default=0.05, help='server delay per response in seconds')
+    parser.add_argument('--jitter', type=float, default=0.02, help='extra random delay per response in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with a 503')
+    parser.add_argument('--finviz-workers', type=int, default=MainScraper.FINVIZ_MAX_WORKERS)
+    parser.add_argument('--digrin-workers', type=int, default=MainScraper.DIGRIN_MAX_WORKERS)
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help='parse Finviz pages in this many worker processes (0 parses in the fetching threads)')
+    parser.add_argument('--stream', action='store_true',
+                        help='read pages in chunks and stop after the needed values')
+    parser.add_argument('--memory', action='store_true',
+                        help='trace peak memory of the end-to-end run (slows it down)')
+    parser.add_argument('--skip-parsing', action='store_true')
+    parser.add_argument('--skip-end-to-end', action='store_true')
+    args = parser.parse_args()
+
+    if not args.skip_parsing:
+        bench_parsing(args.iterations)
+    if not args.skip_end_to_end:
+        parsePool.PARSE_PROCESSES = args.parse_processes
+        MainScraper.STREAM_PAGES = scrapeDigrin.STREAM_PAGES = args.stream
+        server = FixtureServer(args.latency, args.jitter, args.error_rate).start()
+        try:
+            print()
+            bench_end_to_end([int(size) for size in args.sizes.split(',')], server,
+                             args.finviz_workers, args.digrin_workers, args.memory)
+        finally:
+            server.stop()
+            parsePool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
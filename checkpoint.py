@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from records import TickerRecord
+
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+
+
+class CheckpointJournal:
+    """
+    Append-only JSON lines journal of the tickers a run has finished.
+
+    Every finished ticker adds one line: {"ticker", "status": "done", "record"} once its merged
+    record is complete, or {"ticker", "status": "failed", "stage"} when a stage failed. A Digrin
+    failure keeps the Finviz record, so resuming only repeats the Digrin request.
+    The last line of a ticker wins, so a later success replaces an earlier failure.
+    """
+
+    def __init__(self, path=CHECKPOINT_FILE, resume=False):
+        """
+        Parameters:
+        - path (str): Journal file.
+        - resume (bool): Keep the entries of the previous run. A new run starts an empty journal.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = self.load() if resume else {}
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def load(self):
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A run killed in the middle of a write leaves half a line behind
+                    continue
+                entries[entry['ticker']] = entry
+        return entries
+
+    def completed(self):
+        """
+        Return the records of the previous run that finished, keyed by ticker.
+        """
+        return {ticker: TickerRecord.from_dict(entry['record'])
+                for ticker, entry in self.entries.items() if entry['status'] == 'done'}
+
+    def missing_digrin(self):
+        """
+        Return the Finviz records of the previous run whose Digrin request failed, keyed by ticker.
+        """
+        return {ticker: TickerRecord.from_dict(entry['record'])
+                for ticker, entry in self.entries.items() if entry.get('stage') == 'digrin'}
+
+    def write(self, entry):
+        entry['at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with self.lock:
+            self.entries[entry['ticker']] = entry
+            # Flush every line, so a killed run loses at most the ticker being written
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+
+    def record_done(self, record):
+        self.write({'ticker': record.ticker, 'status': 'done', 'record': record.to_dict()})
+
+    def record_failed(self, ticker, stage, record=None):
+        entry = {'ticker': ticker, 'status': 'failed', 'stage': stage}
+        if record is not None:
+            entry['record'] = record.to_dict()
+        self.write(entry)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
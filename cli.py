@@ -0,0 +1,307 @@
+"""
+Command line entry point of the dividend scraper.
+
+    python cli.py finviz ABBV O                    # Finviz data of two tickers, printed
+    python cli.py digrin --file tickers.txt --csv digrin.csv
+    python cli.py full --sheets                    # tickers from the sheet, results back into it
+    python cli.py full --resume --sheets --quiet
+    python cli.py schedule --sheets --quiet        # keep the sheet fresh until interrupted
+    python cli.py distributed --workers 4 --sheets # scrape in 4 worker processes, one sheet write
+    python cli.py worker --queue /shared/workqueue.sqlite   # help a coordinator on another host
+    python cli.py dividends O ABBV --windows 1 7   # store new payments, growth over any window
+    python cli.py screen --where "Dividend Yield > 3%" --where "DGR5 > 5%" --sort=-price_difference --top 20 --sheets
+
+Tickers come from the command line and --file, or from the ticker column of the Google sheet
+when neither is given (screen then uses every ticker in the history store). The Google Sheets libraries are only loaded when a sheet is read or written.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pprint import pprint as pp
+
+import httpCache
+import MainScraper
+import parsePool
+import pipeline
+import scheduler
+import scrapeDigrin
+import sinks
+import workQueue
+from historyStore import DividendStore, HistoryStore
+from metrics import metrics
+from records import ALL_FIELDS, DIGRIN_FIELDS, FINVIZ_FIELDS, TickerRecord
+from scrapeDigrin import get_digrin_data
+from sheetsGateway import SHEET_NAME, SPREADSHEET_NAME, get_gateway, getTickers
+
+COMMAND_FIELDS = {'finviz': FINVIZ_FIELDS, 'digrin': DIGRIN_FIELDS, 'full': ALL_FIELDS, 'schedule': ALL_FIELDS,
+                  'distributed': ALL_FIELDS, 'screen': ALL_FIELDS}
+# Worksheet written by --sheets without a name. The single source commands get their own
+# worksheet, so they never overwrite the other columns of the full table.
+DEFAULT_SHEETS = {'finviz': 'Finviz', 'digrin': 'Digrin', 'full': SHEET_NAME, 'schedule': SHEET_NAME,
+                  'distributed': SHEET_NAME, 'screen': 'Screen'}
+
+
+def read_ticker_file(path):
+    # Tickers are separated by whitespace or commas, '#' starts a comment
+    tickers = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            tickers.extend(line.split('#', 1)[0].replace(',', ' ').split())
+    return tickers
+
+
+def fetch_digrin(ticker):
+    return get_digrin_data(ticker.upper())
+
+
+def fetch_digrin_record(ticker):
+    digrin_data = fetch_digrin(ticker)
+    if digrin_data is None:
+        return None
+    return TickerRecord(ticker).merge_digrin(digrin_data)
+
+
+def build_sinks(args, fields, gateway, row_tickers=None):
+    output_sinks = [] if args.quiet else [sinks.StdoutSink(fields)]
+    if args.csv:
+        output_sinks.append(sinks.CsvSink(args.csv, fields))
+    if args.jsonl:
+        output_sinks.append(sinks.JsonLinesSink(args.jsonl, fields))
+    if args.sheets is not None:
+        output_sinks.append(sinks.SheetsSink(
+            args.spreadsheet, args.sheets or DEFAULT_SHEETS[args.command], fields, gateway,
+            incremental=MainScraper.INCREMENTAL_SHEETS_WRITE, row_tickers=row_tickers,
+            clear_below=args.command == 'screen'))
+    return output_sinks
+
+
+def run_single_source(command, tickers, output_sinks):
+    """
+    Fetch only Finviz or only Digrin data of the tickers into the sinks.
+    """
+    if command == 'finviz':
+        items = MainScraper.iter_ingestion_items(tickers, {})
+        stage = (MainScraper.resolve_financial_info, MainScraper.FINVIZ_MAX_WORKERS)
+    else:
+        items = tickers
+        stage = (fetch_digrin_record, MainScraper.DIGRIN_MAX_WORKERS)
+
+    def write_chunk(records):
+        for sink in output_sinks:
+            sink.write(records)
+
+    pipeline.run_pipeline(items, [stage], write_chunk, chunk_size=MainScraper.SHEETS_CHUNK_SIZE)
+    for sink in output_sinks:
+        sink.close()
+    parsePool.shutdown()
+
+
+def run_scheduler(args, tickers, output_sinks):
+    """
+    Refresh the tickers source by source as their data goes stale, until interrupted.
+    """
+    history = HistoryStore() if MainScraper.RECORD_HISTORY else None
+    refresh = scheduler.RefreshScheduler(
+        tickers, output_sinks,
+        {'finviz': (MainScraper.fetch_financial_info, MainScraper.FINVIZ_MAX_WORKERS),
+         'digrin': (fetch_digrin, MainScraper.DIGRIN_MAX_WORKERS)},
+        intervals={'finviz': args.finviz_interval * 60, 'digrin': args.digrin_interval * 60},
+        history=history, market_hours=not args.all_hours)
+    try:
+        refresh.run()
+    except KeyboardInterrupt:
+        print('Stopped')
+    finally:
+        for sink in output_sinks:
+            sink.close()
+        parsePool.shutdown()
+        if history:
+            history.close()
+        metrics.write_report(MainScraper.METRICS_JSON, MainScraper.METRICS_PROMETHEUS)
+
+
+def run_distributed(args, tickers, output_sinks):
+    """
+    Queue the tickers, scrape them in args.workers worker processes and write the merged
+    records to the sinks in one go. With no local workers, wait for workers on other hosts.
+    """
+    queue = workQueue.WorkQueue(args.queue)
+    queue.push(tickers, args.shards)
+    queue.close()
+
+    command = [sys.executable, os.path.abspath(__file__), 'worker', '--queue', args.queue]
+    command += ['--no-cache'] if args.no_cache else []
+    command += ['--stream'] if args.stream else []
+    processes = [subprocess.Popen(command) for _ in range(args.workers)]
+    for process in processes:
+        process.wait()
+    # Shards a crashed worker left unfinished count as failed
+    records, failed = workQueue.collect(args.queue, wait=not processes)
+    if failed:
+        print(f"{failed} of {len(tickers)} tickers failed")
+
+    if MainScraper.RECORD_HISTORY:
+        history = HistoryStore()
+        history.append(records)
+        history.close()
+    for sink in output_sinks:
+        sink.write(records)
+        sink.close()
+    metrics.write_report(MainScraper.METRICS_JSON, MainScraper.METRICS_PROMETHEUS)
+
+
+def run_dividends(args, tickers):
+    """
+    Store the dividend payments of the tickers that are newer than the stored ones, then print
+    growth rates and streaks computed from the stored history.
+    """
+    # numpy is only loaded for this command
+    import dividendGrowth
+
+    store = DividendStore()
+    if not args.offline:
+        added = MainScraper.fetch_concurrently(
+            tickers, lambda ticker: scrapeDigrin.ingest_dividend_history(ticker.upper(), store),
+            MainScraper.DIGRIN_MAX_WORKERS)
+        print(f"Stored {sum(count or 0 for count in added)} new payments")
+    for ticker in tickers:
+        payments = store.payments(ticker.upper(), args.start, args.end)
+        statistics = dividendGrowth.dividend_statistics(
+            payments, args.windows or dividendGrowth.DGR_WINDOWS, args.through_year)
+        pp(dict({'Ticker': ticker, 'Payments': len(payments)}, **statistics))
+    store.close()
+    metrics.write_report(MainScraper.METRICS_JSON, MainScraper.METRICS_PROMETHEUS)
+
+
+def run_screen(args, tickers, output_sinks):
+    """
+    Filter, sort and cut the latest stored record of every ticker and write the result to the sinks.
+    """
+    # numpy is only loaded for this command
+    import screening
+
+    try:
+        where = [screening.parse_condition(condition) for condition in args.where]
+        sort, descending = screening.parse_sort(args.sort) if args.sort else (None, False)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    history = HistoryStore()
+    records = screening.load_latest_records(history, tickers)
+    history.close()
+    with metrics.timer('screen_query'):
+        results = screening.ScreenIndex(records).query(where, sort, descending, args.top)
+    if not args.quiet:
+        print(f"{len(results)} of {len(records)} tickers")
+    for sink in output_sinks:
+        sink.write(results)
+        sink.close()
+
+
+def parse_args(argv=None):
+    fetching = argparse.ArgumentParser(add_help=False)
+    fetching.add_argument('--no-cache', action='store_true', help='always download pages instead of using the HTTP cache')
+    fetching.add_argument('--stream', action='store_true',
+                          help='read pages in chunks and stop as soon as the values are found (bypasses the cache)')
+
+    source = argparse.ArgumentParser(add_help=False)
+    source.add_argument('tickers', nargs='*', help='ticker symbols')
+    source.add_argument('--file', help='read tickers from a file, separated by whitespace or commas')
+    source.add_argument('--spreadsheet', default=SPREADSHEET_NAME, help='spreadsheet for --sheets and the ticker list')
+
+    common = argparse.ArgumentParser(add_help=False, parents=[source, fetching])
+    common.add_argument('--csv', metavar='PATH', help="write a CSV file ('-' for standard output)")
+    common.add_argument('--jsonl', metavar='PATH', help="write JSON lines ('-' for standard output)")
+    common.add_argument('--sheets', nargs='?', const='', metavar='SHEET',
+                        help='write to a Google Sheets worksheet (default: Finviz, Digrin or IntermediateTable)')
+    common.add_argument('--quiet', action='store_true', help='do not print the records')
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('finviz', parents=[common], help='Finviz quote data only')
+    commands.add_parser('digrin', parents=[common], help='Digrin dividend growth data only')
+    full = commands.add_parser('full', parents=[common], help='Finviz and Digrin data, with history and checkpoints')
+    full.add_argument('--resume', action='store_true',
+                      help='skip tickers the interrupted previous run finished and retry the rest')
+    schedule = commands.add_parser('schedule', parents=[common],
+                                   help='keep refreshing stale data and push every update to the outputs')
+    schedule.add_argument('--finviz-interval', type=float, default=scheduler.REFRESH_INTERVALS['finviz'] / 60,
+                          metavar='MINUTES', help='refresh interval of Finviz data')
+    schedule.add_argument('--digrin-interval', type=float, default=scheduler.REFRESH_INTERVALS['digrin'] / 60,
+                          metavar='MINUTES', help='refresh interval of Digrin data')
+    schedule.add_argument('--all-hours', action='store_true',
+                          help='also refresh Finviz data while the US market is closed')
+    distributed = commands.add_parser('distributed', parents=[common],
+                                      help='Finviz and Digrin data, scraped by several workers over a shared queue')
+    distributed.add_argument('--workers', type=int, default=4,
+                             help='local worker processes (0: only workers started on other hosts)')
+    distributed.add_argument('--shards', type=int, default=workQueue.SHARD_COUNT, help='number of ticker shards')
+    distributed.add_argument('--queue', default=workQueue.QUEUE_DB, metavar='PATH', help='queue database')
+    worker = commands.add_parser('worker', parents=[fetching], help='scrape shards of a distributed run')
+    worker.add_argument('--queue', default=workQueue.QUEUE_DB, metavar='PATH', help='queue database')
+    worker.add_argument('--name', help='worker name (default: host:pid)')
+    dividends = commands.add_parser('dividends', parents=[source],
+                                    help='dividend payment history and growth rates over any window')
+    dividends.add_argument('--windows', type=int, nargs='+', metavar='YEARS',
+                           help='growth windows in years (default: 3 5 10 20)')
+    dividends.add_argument('--through-year', type=int, help='last calendar year to include (default: last year)')
+    dividends.add_argument('--start', metavar='YYYY-MM-DD', help='ignore payments before this ex-dividend date')
+    dividends.add_argument('--end', metavar='YYYY-MM-DD', help='ignore payments after this ex-dividend date')
+    dividends.add_argument('--offline', action='store_true', help='only use the stored payments')
+    screen = commands.add_parser('screen', parents=[common],
+                                 help='filter and rank the latest stored records (default worksheet: Screen)')
+    screen.add_argument('--where', action='append', default=[], metavar='CONDITION',
+                        help="condition like 'Dividend Yield > 3%%' or 'pe_ratio<=20', repeatable")
+    screen.add_argument('--sort', metavar='FIELD', help="field to sort on, e.g. --sort=-dgr5 for descending")
+    screen.add_argument('--top', type=int, metavar='N', help='only the first N tickers')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # The dividends command always streams pages and has neither option
+    if getattr(args, 'no_cache', False):
+        httpCache.CACHE_ENABLED = False
+    if getattr(args, 'stream', False):
+        MainScraper.STREAM_PAGES = scrapeDigrin.STREAM_PAGES = True
+    if args.command == 'worker':
+        finished = workQueue.run_worker(args.queue, args.name)
+        print(f"Finished {finished} shards")
+        return
+
+    # Nothing is authorized until the gateway is first used
+    gateway = get_gateway()
+    tickers = list(args.tickers)
+    if args.file:
+        tickers += read_ticker_file(args.file)
+    from_sheet = not tickers and args.command != 'screen'
+    if from_sheet:
+        tickers = getTickers(gateway, args.spreadsheet)
+
+    if args.command == 'dividends':
+        run_dividends(args, tickers)
+        gateway.close()
+        return
+
+    fields = COMMAND_FIELDS[args.command]
+    row_tickers = None
+    if args.command == 'schedule':
+        # Updates overwrite the ticker's row. Tickers read from the target sheet already have one.
+        row_tickers = tickers if from_sheet and args.sheets in ('', SHEET_NAME) else []
+    output_sinks = build_sinks(args, fields, gateway, row_tickers)
+    if args.command == 'full':
+        MainScraper.run(tickers, output_sinks, args.resume)
+    elif args.command == 'schedule':
+        run_scheduler(args, tickers, output_sinks)
+    elif args.command == 'distributed':
+        run_distributed(args, tickers, output_sinks)
+    elif args.command == 'screen':
+        run_screen(args, tickers, output_sinks)
+    else:
+        run_single_source(args.command, tickers, output_sinks)
+    gateway.close()
+
+
+if __name__ == '__main__':
+    main()
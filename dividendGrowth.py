@@ -0,0 +1,119 @@
+from datetime import date
+
+import numpy as np
+
+# Growth windows in years reported by dividend_statistics by default, the same as Digrin's DGR values
+DGR_WINDOWS = (3, 5, 10, 20)
+
+
+def annual_dividends(payments):
+    """
+    Total the payments per calendar year of their ex-dividend date.
+
+    Parameters:
+    - payments (list of tuples): (ex_date, payment_date, amount) per payment, as DividendStore.payments returns.
+
+    Returns:
+    - (int, numpy.ndarray): The first year and the total of every year from it, 0.0 for years
+      without payments. (None, empty array) without payments.
+    """
+    if not payments:
+        return None, np.zeros(0)
+    years = np.array([int(ex_date[:4]) for ex_date, _, _ in payments])
+    amounts = np.array([amount for _, _, amount in payments], dtype=float)
+    first_year = int(years.min())
+    return first_year, np.bincount(years - first_year, weights=amounts)
+
+
+def cagr(start, end, years):
+    """
+    Compound annual growth rate from start to end over years, broadcast over arrays.
+    NaN where start is not positive or years is not positive.
+    """
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    years = np.asarray(years, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = (end / start) ** (1 / years) - 1
+    return np.where((start > 0) & (years > 0) & np.isfinite(rates), rates, np.nan)
+
+
+def growth_rates(totals, window):
+    """
+    Dividend growth rate over window years ending in every year that has window years before it.
+
+    Parameters:
+    - totals (numpy.ndarray): Annual totals, as annual_dividends returns.
+    - window (int): Number of years.
+
+    Returns:
+    - numpy.ndarray: len(totals) - window growth rates, the first ending window years after the first year.
+    """
+    totals = np.asarray(totals, dtype=float)
+    if window <= 0 or window >= len(totals):
+        return np.zeros(0)
+    return cagr(totals[:-window], totals[window:], window)
+
+
+def trailing_run(flags):
+    # Number of True values at the end of flags
+    breaks = np.flatnonzero(~flags)
+    return int(len(flags) - (breaks[-1] + 1 if breaks.size else 0))
+
+
+def growth_streak(totals):
+    # Consecutive years up to the last one whose total was higher than the year before
+    return trailing_run(np.diff(totals) > 0)
+
+
+def payment_streak(totals):
+    # Consecutive years up to the last one with at least one payment
+    return trailing_run(np.asarray(totals) > 0)
+
+
+def dividend_statistics(payments, windows=DGR_WINDOWS, through_year=None):
+    """
+    Dividend growth figures of one ticker from its stored payments.
+
+    Only calendar years up to through_year count, so the year in progress does not look like a cut.
+    Years up to through_year without payments count as zero, so a suspended dividend ends the
+    streaks and shows up in the growth windows.
+
+    Parameters:
+    - payments (list of tuples): (ex_date, payment_date, amount) per payment.
+    - windows (iterable of int): Growth windows in years, each reported as 'DGR<window>'.
+    - through_year (int): Last year to include. Defaults to last year.
+
+    Returns:
+    - dict: 'DGR<window>' per window and 'CAGR' over every included year (rounded to 4 decimals,
+      NaN when the history is too short), 'Growth Streak', 'Years Paying Dividends',
+      'Last Year' and its 'Annual Dividend'.
+    """
+    through_year = through_year or date.today().year - 1
+    first_year, totals = annual_dividends(payments)
+    if first_year is not None:
+        years = max(0, through_year - first_year + 1)
+        totals = np.pad(totals[:years], (0, max(0, years - len(totals))))
+    windows = np.asarray(list(windows), dtype=int)
+    statistics = {}
+    if not len(totals):
+        statistics.update({f'DGR{window}': np.nan for window in windows})
+        statistics.update({'CAGR': np.nan, 'Growth Streak': 0, 'Years Paying Dividends': 0,
+                           'Last Year': None, 'Annual Dividend': np.nan})
+        return statistics
+
+    # Every window at once: the start year of each window, NaN where the history is too short
+    last = len(totals) - 1
+    starts = np.where(windows <= last, totals[np.clip(last - windows, 0, last)], np.nan)
+    rates = cagr(starts, totals[last], windows)
+    for window, rate in zip(windows, rates):
+        statistics[f'DGR{window}'] = round(float(rate), 4)
+    # Growth since the first year with a payment
+    paid = np.flatnonzero(totals > 0)
+    start = paid[0] if paid.size else last
+    statistics['CAGR'] = round(float(cagr(totals[start], totals[last], last - start)), 4)
+    statistics['Growth Streak'] = growth_streak(totals)
+    statistics['Years Paying Dividends'] = payment_streak(totals)
+    statistics['Last Year'] = first_year + last
+    statistics['Annual Dividend'] = round(float(totals[last]), 4)
+    return statistics
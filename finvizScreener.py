@@ -0,0 +1,124 @@
+from importlib.util import find_spec
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+import httpCache
+from metrics import metrics
+
+# Custom screener view (v=152) with only the columns the scraper needs:
+# Ticker, Market Cap, P/E, Forward P/E, Dividend yield, EPS (ttm), Sales Q/Q, Shares Outstanding, ROE, Price
+FINVIZ_SCREENER_URL = 'https://finviz.com/screener.ashx?v=152&t={tickers}&c=1,6,7,8,14,16,23,24,33,65'
+# Finviz shows 20 rows per screener page, so one request covers at most 20 tickers
+SCREENER_CHUNK_SIZE = 20
+PARSER = 'lxml' if find_spec('lxml') else 'html.parser'
+TABLE_ROWS = SoupStrainer('tr')
+
+# Screener column header mapped to the quote page snapshot label it replaces
+SCREENER_LABELS = {
+    'Market Cap': 'Market Cap',
+    'P/E': 'P/E',
+    'Fwd P/E': 'Forward P/E',
+    'Forward P/E': 'Forward P/E',
+    'Dividend': 'Dividend %',
+    'Dividend %': 'Dividend %',
+    'Dividend Yield': 'Dividend %',
+    'EPS': 'EPS (ttm)',
+    'EPS (ttm)': 'EPS (ttm)',
+    'Sales Q/Q': 'Sales Q/Q',
+    'Outstanding': 'Shs Outstand',
+    'Shs Outstand': 'Shs Outstand',
+    'ROE': 'ROE',
+    'Price': 'Price',
+}
+
+
+def chunk_tickers(tickers, size=None):
+    size = size or SCREENER_CHUNK_SIZE
+    for start in range(0, len(tickers), size):
+        yield tickers[start:start + size]
+
+
+def to_number(text):
+    # Screener cells look like '12.34', '6.29%' or '-' for a missing value
+    try:
+        return float(text.replace('%', '').replace(',', ''))
+    except (AttributeError, ValueError):
+        return None
+
+
+def parse_screener_table(html):
+    """
+    Read the result table of a Finviz screener page.
+
+    Parameters:
+    - html (str): Raw HTML of the screener page.
+
+    Returns:
+    - dict: Upper case ticker mapped to a dict of column header to cell text.
+    """
+    with metrics.timer('parse', source='finviz_screener'):
+        rows = BeautifulSoup(html, PARSER, parse_only=TABLE_ROWS).find_all('tr')
+        table = {}
+        headers = None
+        for row in rows:
+            cells = [cell.get_text(strip=True) for cell in row.find_all(['th', 'td'], recursive=False)]
+            if headers is None:
+                # The header row is the first row with a 'Ticker' column next to other columns
+                if 'Ticker' in cells and len(cells) > 1:
+                    headers = cells
+                continue
+            if len(cells) != len(headers):
+                continue
+            values = dict(zip(headers, cells))
+            if values['Ticker']:
+                table[values['Ticker'].upper()] = values
+        return table
+
+
+def screener_snapshot(values):
+    """
+    Translate one screener row into the snapshot labels of a quote page.
+
+    Finviz defines Forward P/E as Price / EPS next Y and Dividend % as Dividend / Price, so
+    'EPS next Y' is derived as Price / Forward P/E and 'Dividend' as Price * Dividend %.
+    Both inputs are rounded to 2 decimals on the screener, so the estimates can differ from
+    the quote page values by a cent or so. A label the row cannot supply is left out, so the
+    caller falls back to the quote page.
+    """
+    snapshot = {SCREENER_LABELS[header]: text for header, text in values.items() if header in SCREENER_LABELS}
+
+    price = to_number(snapshot.get('Price'))
+    forward_pe = to_number(snapshot.get('Forward P/E'))
+    if price is not None and forward_pe:
+        snapshot['EPS next Y'] = f'{price / forward_pe:.2f}'
+
+    dividend_yield = snapshot.get('Dividend %')
+    if dividend_yield == '-':
+        snapshot['Dividend'] = '-'
+    elif price is not None and to_number(dividend_yield) is not None:
+        snapshot['Dividend'] = f'{price * to_number(dividend_yield) / 100:.2f}'
+    return snapshot
+
+
+def fetch_screener_snapshots(tickers, headers=None):
+    """
+    Fetch quote data of up to SCREENER_CHUNK_SIZE tickers with one screener request.
+
+    Parameters:
+    - tickers (list): Ticker symbols.
+    - headers (dict): Request headers.
+
+    Returns:
+    - dict: Upper case ticker mapped to its snapshot. Tickers missing from the screener
+      (or all of them, when the request fails) are left out.
+    """
+    url = FINVIZ_SCREENER_URL.format(tickers=','.join(ticker.upper() for ticker in tickers))
+    try:
+        page = httpCache.fetch(url, headers=headers)
+    except requests.RequestException as e:
+        metrics.increment('failures', source='finviz_screener')
+        print(f"Error: Unable to fetch screener data for {', '.join(tickers)}. {e}")
+        return {}
+    table = page.get_parsed('finviz-screener', parse_screener_table)
+    return {ticker: screener_snapshot(values) for ticker, values in table.items()}
@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from records import ALL_FIELDS, INTEGER_FIELDS
+
+HISTORY_DB = 'history.sqlite'
+
+# Record key, column name and SQLite type of every stored field, derived from the record fields.
+# The column is the record attribute, the key the sheet header used in the dictionaries of query.
+FIELDS = [(header, name, 'INTEGER' if name in INTEGER_FIELDS else 'REAL') for name, header in ALL_FIELDS]
+COLUMNS = [column for _, column, _ in FIELDS]
+
+
+def to_number(value, sqlite_type):
+    # 'N/A', error messages and missing values are stored as NULL
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+        return None
+    return int(value) if sqlite_type == 'INTEGER' else float(value)
+
+
+class HistoryStore:
+    """
+    Append-only SQLite history of every merged Finviz + Digrin record.
+
+    Every row is keyed by (ticker, scraped_at), with scraped_at an ISO 8601 UTC timestamp,
+    and every field has its own typed numeric column.
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        columns = ', '.join(f'{column} {sqlite_type}' for _, column, sqlite_type in FIELDS)
+        with self.lock, self.connection:
+            self.connection.execute(
+                f'CREATE TABLE IF NOT EXISTS scrapes (ticker TEXT NOT NULL, scraped_at TEXT NOT NULL, {columns}, '
+                'PRIMARY KEY (ticker, scraped_at))')
+            # Fields added to the records after the table was created get their column now
+            existing = {row[1] for row in self.connection.execute('PRAGMA table_info(scrapes)')}
+            for _, column, sqlite_type in FIELDS:
+                if column not in existing:
+                    self.connection.execute(f'ALTER TABLE scrapes ADD COLUMN {column} {sqlite_type}')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS scrapes_scraped_at ON scrapes (scraped_at)')
+            # When each source of each ticker was last fetched, for the refresh scheduler
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS refresh_state (ticker TEXT NOT NULL, source TEXT NOT NULL, '
+                'refreshed_at TEXT NOT NULL, PRIMARY KEY (ticker, source))')
+
+    def append(self, records, scraped_at=None):
+        """
+        Store a list of merged records.
+
+        Parameters:
+        - records (list of TickerRecord): Records as passed to write_financial_data_to_google_sheets.
+        - scraped_at (str): Timestamp of the run. Defaults to the current UTC time.
+        """
+        scraped_at = scraped_at or datetime.now(timezone.utc).isoformat(timespec='seconds')
+        rows = [[str(record.ticker), scraped_at] +
+                [to_number(getattr(record, column), sqlite_type) for _, column, sqlite_type in FIELDS]
+                for record in records]
+        placeholders = ', '.join('?' * (len(COLUMNS) + 2))
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f'INSERT OR REPLACE INTO scrapes (ticker, scraped_at, {", ".join(COLUMNS)}) '
+                f'VALUES ({placeholders})', rows)
+
+    def query(self, sql, parameters=()):
+        with self.lock:
+            cursor = self.connection.execute(sql, parameters)
+            rows = cursor.fetchall()
+        return [dict(zip(['Ticker', 'Scraped At'] + [key for key, _, _ in FIELDS], row)) for row in rows]
+
+    def latest_per_ticker(self):
+        """
+        Return the most recent record of every ticker, ordered by ticker.
+        """
+        return self.query(
+            f'SELECT s.ticker, s.scraped_at, {", ".join("s." + column for column in COLUMNS)} FROM scrapes s '
+            'JOIN (SELECT ticker, MAX(scraped_at) AS scraped_at FROM scrapes GROUP BY ticker) latest '
+            'ON s.ticker = latest.ticker AND s.scraped_at = latest.scraped_at ORDER BY s.ticker')
+
+    def time_series(self, ticker, start=None, end=None):
+        """
+        Return every stored record of one ticker, oldest first.
+
+        Parameters:
+        - ticker (str): Ticker symbol.
+        - start (str), end (str): Optional ISO 8601 bounds on scraped_at, both inclusive.
+        """
+        sql = f'SELECT ticker, scraped_at, {", ".join(COLUMNS)} FROM scrapes WHERE ticker = ?'
+        parameters = [ticker]
+        if start:
+            sql += ' AND scraped_at >= ?'
+            parameters.append(start)
+        if end:
+            sql += ' AND scraped_at <= ?'
+            parameters.append(end)
+        return self.query(sql + ' ORDER BY scraped_at', parameters)
+
+    def mark_refreshed(self, pairs, refreshed_at=None):
+        """
+        Store that the sources of the tickers were fetched.
+
+        Parameters:
+        - pairs (list of tuples): (ticker, source) per successful fetch.
+        - refreshed_at (str): ISO 8601 timestamp. Defaults to the current UTC time.
+        """
+        refreshed_at = refreshed_at or datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO refresh_state (ticker, source, refreshed_at) VALUES (?, ?, ?)',
+                [(ticker, source, refreshed_at) for ticker, source in pairs])
+
+    def refresh_times(self):
+        """
+        Return the last refresh time of every (ticker, source) pair as an ISO 8601 string.
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT ticker, source, refreshed_at FROM refresh_state').fetchall()
+        return {(ticker, source): refreshed_at for ticker, source, refreshed_at in rows}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class DividendStore:
+    """
+    SQLite store of every dividend payment of every ticker, next to the scrape history.
+
+    A payment is keyed by (ticker, ex_date, amount), so storing a payment twice is harmless
+    and a special dividend with the same ex-dividend date as a regular one is kept.
+    Dates are ISO 8601 strings (YYYY-MM-DD).
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS dividends (ticker TEXT NOT NULL, ex_date TEXT NOT NULL, '
+                'payment_date TEXT, amount REAL NOT NULL, PRIMARY KEY (ticker, ex_date, amount))')
+
+    def latest_ex_date(self, ticker):
+        """
+        Return the ex-dividend date of the ticker's newest stored payment, or None.
+        """
+        with self.lock:
+            return self.connection.execute(
+                'SELECT MAX(ex_date) FROM dividends WHERE ticker = ?', (ticker,)).fetchone()[0]
+
+    def add(self, ticker, payments):
+        """
+        Store payments of one ticker.
+
+        Parameters:
+        - ticker (str): Ticker symbol.
+        - payments (list of tuples): (ex_date, payment_date, amount) per payment.
+
+        Returns:
+        - int: Number of payments that were not stored yet.
+        """
+        with self.lock, self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO dividends (ticker, ex_date, payment_date, amount) VALUES (?, ?, ?, ?)',
+                [(ticker, ex_date, payment_date, amount) for ex_date, payment_date, amount in payments])
+            return self.connection.total_changes - before
+
+    def payments(self, ticker, start=None, end=None):
+        """
+        Return the stored (ex_date, payment_date, amount) payments of one ticker, oldest first.
+
+        Parameters:
+        - ticker (str): Ticker symbol.
+        - start (str), end (str): Optional ISO 8601 bounds on ex_date, both inclusive.
+        """
+        sql = 'SELECT ex_date, payment_date, amount FROM dividends WHERE ticker = ?'
+        parameters = [ticker]
+        if start:
+            sql += ' AND ex_date >= ?'
+            parameters.append(start)
+        if end:
+            sql += ' AND ex_date <= ?'
+            parameters.append(end)
+        with self.lock:
+            return self.connection.execute(sql + ' ORDER BY ex_date', parameters).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
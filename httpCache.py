@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import httpClient
+from metrics import metrics
+
+CACHE_ENABLED = True
+CACHE_DIR = os.path.join('.cache', 'http')
+# Seconds a cached page is reused without contacting the server, per host
+# Hosts that are not listed are always revalidated with the server
+CACHE_TTL = {
+    'finviz.com': 15 * 60,
+    'www.digrin.com': 7 * 24 * 60 * 60,
+}
+# Per-thread upper bound on the TTL, see max_age
+limits = threading.local()
+
+
+class CachedResponse:
+    """
+    The body of a fetched page, together with what the cache knows about it.
+
+    Attributes:
+    - url (str): Requested URL.
+    - text (str): Decoded page body.
+    - content_hash (str): SHA-256 of the body, used to detect unchanged pages.
+    - from_cache (bool): True when the body was served from disk (fresh or revalidated with a 304).
+    """
+
+    def __init__(self, url, text, content_hash, from_cache, meta=None):
+        self.url = url
+        self.text = text
+        self.content_hash = content_hash
+        self.from_cache = from_cache
+        self.meta = meta
+
+    def get_parsed(self, key, parse_function):
+        """
+        Return parse_function(self.text), reusing the stored result when the page content has not changed.
+
+        Parameters:
+        - key (str): Name of the parse result, e.g. 'finviz-snapshot'. Must be stable between runs.
+        - parse_function (callable): Function turning the page text into a JSON-serializable value.
+
+        Returns:
+        - The parsed value.
+        """
+        if self.meta is None:
+            return parse_function(self.text)
+
+        parsed = self.meta.setdefault('parsed', {})
+        if key not in parsed:
+            parsed[key] = parse_function(self.text)
+            save_meta(self.url, self.meta)
+        return parsed[key]
+
+
+@contextmanager
+def max_age(seconds):
+    """
+    Serve no cached page older than seconds to fetches made by this thread inside the with block,
+    whatever their TTL. Older pages are revalidated or downloaded again.
+    """
+    previous = getattr(limits, 'max_age', None)
+    limits.max_age = seconds if previous is None else min(previous, seconds)
+    try:
+        yield
+    finally:
+        limits.max_age = previous
+
+
+def cache_paths(url):
+    key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, key + '.html'), os.path.join(CACHE_DIR, key + '.json')
+
+
+def write_atomic(path, data):
+    # Write to a temporary file first so a crash never leaves half a cache entry behind.
+    # Every write gets its own file, since threads fetching the same URL write the same entry.
+    descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+    except BaseException:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_meta(url):
+    _, meta_path = cache_paths(url)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_meta(url, meta):
+    _, meta_path = cache_paths(url)
+    write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+
+
+def load_body(url):
+    body_path, _ = cache_paths(url)
+    try:
+        with open(body_path, 'r', encoding='utf-8') as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def fetch(url, headers=None, ttl=None):
+    """
+    Fetch a page through the on-disk cache.
+
+    A cached page younger than its TTL is returned without a request. Older pages are
+    revalidated with If-None-Match / If-Modified-Since when the server sent an ETag or
+    Last-Modified header, and a 304 reply reuses the cached body.
+
+    Parameters:
+    - url (str): URL to fetch.
+    - headers (dict): Extra request headers.
+    - ttl (float): Seconds the cached page stays fresh. Defaults to CACHE_TTL for the URL's host,
+      and is capped by an enclosing max_age block.
+
+    Returns:
+    - CachedResponse
+
+    Raises:
+    - requests.RequestException: When the request fails or the server returns an error status.
+    """
+    if not CACHE_ENABLED:
+        response = httpClient.get(url, headers=headers)
+        response.raise_for_status()
+        text = response.text
+        response.close()
+        return CachedResponse(url, text, hashlib.sha256(text.encode('utf-8')).hexdigest(), False)
+
+    if ttl is None:
+        ttl = CACHE_TTL.get(urlparse(url).hostname, 0)
+    if getattr(limits, 'max_age', None) is not None:
+        ttl = min(ttl, limits.max_age)
+
+    now = time.time()
+    meta = load_meta(url)
+    body = load_body(url) if meta else None
+    if body is None:
+        meta = None
+
+    host = urlparse(url).hostname
+    if meta and now - meta['fetched_at'] < ttl:
+        metrics.increment('cache', result='fresh', host=host)
+        return CachedResponse(url, body, meta['content_hash'], True, meta)
+
+    request_headers = dict(headers or {})
+    if meta:
+        if meta.get('etag'):
+            request_headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request_headers['If-Modified-Since'] = meta['last_modified']
+
+    response = httpClient.get(url, headers=request_headers)
+    if response.status_code == 304 and meta:
+        metrics.increment('cache', result='revalidated', host=host)
+        response.close()
+        meta['fetched_at'] = now
+        save_meta(url, meta)
+        return CachedResponse(url, body, meta['content_hash'], True, meta)
+
+    response.raise_for_status()
+    metrics.increment('cache', result='miss', host=host)
+    text = response.text
+    content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    new_meta = {
+        'url': url,
+        'fetched_at': now,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'content_hash': content_hash,
+        # Parse results stay valid as long as the content is identical
+        'parsed': meta['parsed'] if meta and meta['content_hash'] == content_hash else {},
+    }
+    response.close()
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    body_path, _ = cache_paths(url)
+    write_atomic(body_path, text.encode('utf-8'))
+    save_meta(url, new_meta)
+    return CachedResponse(url, text, content_hash, False, new_meta)
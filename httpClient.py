@@ -0,0 +1,196 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import rateLimiter
+from metrics import metrics
+
+# (connect, read) timeout in seconds for every request
+DEFAULT_TIMEOUT = (5, 20)
+# Connections kept alive per host
+POOL_SIZE = 16
+MAX_RETRIES = 3
+# Retry n waits a random time between 0 and min(BACKOFF_MAX, BACKOFF_BASE * 2 ** n) seconds
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Send a second copy of a request that has not answered after this many seconds.
+# None disables hedged requests.
+HEDGE_AFTER = None
+
+session = None
+session_lock = threading.Lock()
+hedge_pool = ThreadPoolExecutor(max_workers=POOL_SIZE)
+
+
+def get_session():
+    """
+    Return the process-wide requests.Session, creating it on first use.
+
+    The session keeps connections alive, so requests to the same host reuse
+    their TCP and TLS connection.
+    """
+    global session
+    with session_lock:
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        return session
+
+
+def close_session():
+    global session
+    with session_lock:
+        if session is not None:
+            session.close()
+            session = None
+
+
+def retry_after_seconds(response):
+    # Retry-After is either a number of seconds or an HTTP date
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt):
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def send(url, headers, timeout, stream=False):
+    return get_session().get(url, headers=headers, timeout=timeout, stream=stream)
+
+
+def close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def record_outcome(limiter, future, elapsed):
+    if future.cancelled():
+        return
+    limiter.record(None if future.exception() is not None else future.result().status_code, elapsed)
+
+
+def send_hedged(url, headers, timeout, hedge_after, stream=False, limiter=None):
+    """
+    Send a request, and a second copy of it when the first has not answered within hedge_after seconds.
+
+    The first successful response wins and the other one is closed when it arrives.
+    With a limiter, the second copy needs a token of its own. It is not sent when no token
+    is available right away, and its outcome is reported to the limiter.
+    """
+    first = hedge_pool.submit(send, url, headers, timeout, stream)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+
+    if limiter is not None and not (hasattr(limiter, 'try_acquire') and limiter.try_acquire()):
+        metrics.increment('hedges_skipped', host=urlparse(url).hostname)
+        return first.result()
+    start = time.perf_counter()
+    hedge = hedge_pool.submit(send, url, headers, timeout, stream)
+    if limiter is not None:
+        hedge.add_done_callback(lambda future: record_outcome(limiter, future, time.perf_counter() - start))
+    futures = [first, hedge]
+    while futures:
+        done, pending = wait(futures, return_when=FIRST_COMPLETED)
+        successful = [future for future in done if future.exception() is None]
+        if successful:
+            for future in successful[1:]:
+                close_response(future)
+            for future in pending:
+                future.add_done_callback(close_response)
+            return successful[0].result()
+        futures = list(pending)
+    # Both copies failed, raise the error of the first one
+    return first.result()
+
+
+def get(url, headers=None, timeout=None, hedge_after=None, stream=False):
+    """
+    Send a GET request through the shared session, retrying transient failures.
+
+    Connection errors, timeouts and the statuses in RETRY_STATUSES are retried up to
+    MAX_RETRIES times with jittered exponential backoff. A Retry-After header from the
+    server replaces the computed backoff. Every attempt waits for the host's rate limiter
+    (see rateLimiter.RATE_LIMITS) and reports its outcome to it.
+
+    Parameters:
+    - url (str): URL to fetch.
+    - headers (dict): Request headers.
+    - timeout: Timeout passed to requests. Defaults to DEFAULT_TIMEOUT.
+    - hedge_after (float): Seconds before a hedged second request is sent. Defaults to HEDGE_AFTER.
+    - stream (bool): Return before the body is downloaded. The caller reads it, closes the
+      response and counts bytes_downloaded itself.
+
+    Returns:
+    - requests.Response: The last response received. Error statuses are not raised.
+
+    Raises:
+    - requests.RequestException: When the last attempt fails to connect or times out.
+    """
+    timeout = timeout or DEFAULT_TIMEOUT
+    hedge_after = hedge_after if hedge_after is not None else HEDGE_AFTER
+    host = urlparse(url).hostname
+    limiter = rateLimiter.get_limiter(host)
+
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            metrics.increment('retries', host=host)
+        if limiter:
+            limiter.acquire()
+        start = time.perf_counter()
+        try:
+            if hedge_after is not None:
+                response = send_hedged(url, headers, timeout, hedge_after, stream, limiter)
+            else:
+                response = send(url, headers, timeout, stream)
+        except (requests.ConnectionError, requests.Timeout):
+            elapsed = time.perf_counter() - start
+            metrics.observe('http_request', elapsed, host=host)
+            if limiter:
+                limiter.record(None, elapsed)
+            if attempt == MAX_RETRIES:
+                metrics.increment('failures', host=host)
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+        elapsed = time.perf_counter() - start
+        metrics.observe('http_request', elapsed, host=host)
+        if limiter:
+            limiter.record(response.status_code, elapsed)
+
+        if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            delay = retry_after_seconds(response)
+            response.close()
+            if limiter and delay is not None:
+                limiter.pause(delay)
+            time.sleep(delay if delay is not None else backoff_delay(attempt))
+            continue
+
+        if response.status_code >= 400:
+            metrics.increment('failures', host=host)
+        if not stream:
+            metrics.increment('bytes_downloaded', len(response.content), host=host)
+        return response
@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRIC_PREFIX = 'scraper'
+
+
+class Histogram:
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        # One count per bucket plus one for values above the last bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th value, capped at the largest value seen
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+
+def label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def escape_label_value(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+class Metrics:
+    """
+    Thread-safe registry of stage latencies and counters for one scrape run.
+
+    Latencies are kept per stage as histograms, counters (bytes downloaded, retries,
+    failures, ...) as running totals. Both carry free-form labels such as source or host.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+            self.started_at = time.time()
+
+    def observe(self, stage, seconds, **labels):
+        key = label_key(dict(labels, stage=stage))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """
+        Time the body of a with block as one observation of stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def report(self):
+        """
+        Return the run report as a JSON-serializable dictionary.
+        """
+        with self.lock:
+            stages = []
+            for key, histogram in sorted(self.histograms.items()):
+                stage = dict(key)
+                stage.update({
+                    'count': histogram.count,
+                    'total_seconds': round(histogram.total, 6),
+                    'mean_seconds': round(histogram.total / histogram.count, 6),
+                    'p50_seconds': histogram.quantile(0.5),
+                    'p95_seconds': histogram.quantile(0.95),
+                    'p99_seconds': histogram.quantile(0.99),
+                    'max_seconds': round(histogram.maximum, 6),
+                })
+                stages.append(stage)
+            counters = [dict(key, name=name, value=value) for (name, key), value in sorted(self.counters.items())]
+            return {
+                'started_at': self.started_at,
+                'duration_seconds': round(time.time() - self.started_at, 3),
+                'stages': stages,
+                'counters': counters,
+            }
+
+    def prometheus_text(self):
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        histogram_name = f'{METRIC_PREFIX}_stage_seconds'
+        lines = [f'# HELP {histogram_name} Time spent per scrape stage.',
+                 f'# TYPE {histogram_name} histogram']
+        with self.lock:
+            for key, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{histogram_name}_bucket{format_labels(key, [("le", str(bound))])} {cumulative}')
+                lines.append(f'{histogram_name}_bucket{format_labels(key, [("le", "+Inf")])} {histogram.count}')
+                lines.append(f'{histogram_name}_sum{format_labels(key)} {histogram.total}')
+                lines.append(f'{histogram_name}_count{format_labels(key)} {histogram.count}')
+
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                counter_name = f'{METRIC_PREFIX}_{name}_total'
+                lines.append(f'# TYPE {counter_name} counter')
+                for (counter, key), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f'{counter_name}{format_labels(key)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_report(self, json_path=None, prometheus_path=None):
+        if json_path:
+            with open(json_path, 'w', encoding='utf-8') as file:
+                json.dump(self.report(), file, indent=2)
+        if prometheus_path:
+            with open(prometheus_path, 'w', encoding='utf-8') as file:
+                file.write(self.prometheus_text())
+
+
+# Registry shared by every module of a run
+metrics = Metrics()
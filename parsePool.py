@@ -0,0 +1,47 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import metrics
+
+# Number of worker processes that parse pages. 0 parses in the thread that fetched the page.
+PARSE_PROCESSES = 0
+
+pool = None
+pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the shared process pool, creating it on first use.
+
+    Workers are started with 'spawn' so they never inherit locks held by the fetching threads.
+    """
+    global pool
+    with pool_lock:
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=PARSE_PROCESSES,
+                                       mp_context=multiprocessing.get_context('spawn'))
+        return pool
+
+
+def run_parser(function, *args):
+    """
+    Call function(*args) in a worker process when PARSE_PROCESSES is set, otherwise in this thread.
+
+    The function and its arguments are pickled, so function must be defined at module level and
+    should return a small result (a dict of values), never a parsed document.
+    """
+    if PARSE_PROCESSES <= 0:
+        return function(*args)
+    # Timings recorded inside the worker stay in that process, so time the round trip here
+    with metrics.timer('parse_pool', function=function.__name__):
+        return get_pool().submit(function, *args).result()
+
+
+def shutdown():
+    global pool
+    with pool_lock:
+        if pool is not None:
+            pool.shutdown()
+            pool = None
@@ -0,0 +1,120 @@
+import queue
+import threading
+
+# Maximum number of tickers between the source and the sink at any moment
+MAX_IN_FLIGHT = 64
+# Number of finished rows handed to the sink at once
+CHUNK_SIZE = 50
+
+DONE = object()
+
+
+def start_stage(input_queue, output_queue, function, workers):
+    """
+    Start worker threads that apply function to every (index, value) pair from input_queue.
+
+    A value of None is passed on unchanged, so a ticker that failed in an earlier stage
+    still reaches the sink and keeps the output in order. The last worker to see DONE
+    passes it on to output_queue.
+    """
+    remaining = [workers]
+    lock = threading.Lock()
+
+    def work():
+        while True:
+            item = input_queue.get()
+            if item is DONE:
+                # Leave DONE in the queue for the other workers of this stage
+                input_queue.put(DONE)
+                with lock:
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        output_queue.put(DONE)
+                return
+
+            index, value = item
+            if value is not None:
+                try:
+                    value = function(value)
+                except Exception as e:
+                    print(f"Error: pipeline stage {function.__name__} failed. {e}")
+                    value = None
+            output_queue.put((index, value))
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def run_pipeline(items, stages, sink, chunk_size=CHUNK_SIZE, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Stream items through a chain of stages into a sink.
+
+    Every stage runs in its own pool of threads and is connected to the next by a bounded
+    queue, so different stages work on different items at the same time. Results reach the
+    sink in the original order, in lists of at most chunk_size. At most max_in_flight items
+    are held between the source and the sink, so memory does not grow with the number of items.
+
+    Parameters:
+    - items (iterable): Input values, e.g. ticker symbols.
+    - stages (list of tuples): (function, workers) pairs. Each function takes the result of the
+      previous stage and returns its own result, or None to drop the item.
+    - sink (callable): Called with each list of finished results.
+    - chunk_size (int): Number of results per sink call.
+    - max_in_flight (int): Maximum number of items between source and sink.
+
+    Returns:
+    - int: Number of results handed to the sink.
+
+    Raises:
+    - Exception: Whatever iterating items raised, after the items before it reached the sink.
+    """
+    slots = threading.Semaphore(max_in_flight)
+    queues = [queue.Queue(maxsize=max_in_flight + 1) for _ in range(len(stages) + 1)]
+    # Exception raised by the items iterator, which runs in the producer thread
+    source_error = []
+
+    def produce():
+        try:
+            for index, item in enumerate(items):
+                slots.acquire()
+                queues[0].put((index, item))
+        except Exception as e:
+            source_error.append(e)
+        finally:
+            # Without DONE the stages and the loop below would wait forever
+            queues[0].put(DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    for stage_number, (function, workers) in enumerate(stages):
+        start_stage(queues[stage_number], queues[stage_number + 1], function, workers)
+
+    # Results can finish out of order, keep them until every earlier index has arrived
+    pending = {}
+    next_index = 0
+    chunk = []
+    written = 0
+    while True:
+        item = queues[-1].get()
+        if item is DONE:
+            break
+        index, value = item
+        pending[index] = value
+        while next_index in pending:
+            value = pending.pop(next_index)
+            next_index += 1
+            slots.release()
+            if value is not None:
+                chunk.append(value)
+            if len(chunk) >= chunk_size:
+                sink(chunk)
+                written += len(chunk)
+                chunk = []
+
+    if chunk:
+        sink(chunk)
+        written += len(chunk)
+    if source_error:
+        raise source_error[0]
+    return written
@@ -0,0 +1,153 @@
+import threading
+import time
+
+from metrics import metrics
+
+# Requests per second allowed per host. The limiter starts at 'rate' and adapts between
+# 'min_rate' and 'max_rate'; 'burst' requests may be sent back to back after an idle period.
+# Hosts that are not listed are not throttled.
+RATE_LIMITS = {
+    'finviz.com': {'rate': 4.0, 'min_rate': 0.5, 'max_rate': 10.0, 'burst': 4},
+    'www.digrin.com': {'rate': 0.5, 'min_rate': 0.1, 'max_rate': 2.0, 'burst': 1},
+}
+# Statuses that mean the host wants us to slow down. Server errors (5xx) count as well.
+THROTTLE_STATUSES = {403, 429}
+# The rate is multiplied by THROTTLE_DECREASE after a throttle status and by LATENCY_DECREASE
+# when a response takes more than LATENCY_THRESHOLD times the host's average latency
+THROTTLE_DECREASE = 0.5
+LATENCY_DECREASE = 0.8
+LATENCY_THRESHOLD = 2.0
+# Weight of the newest response in the average latency
+LATENCY_SMOOTHING = 0.2
+# Each healthy response raises the rate by this share of max_rate
+INCREASE_STEP = 0.02
+
+limiters = {}
+limiters_lock = threading.Lock()
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket for one host whose rate adapts to the host's responses (AIMD).
+
+    Healthy responses raise the rate additively, throttle statuses, server errors, timeouts
+    and latency spikes cut it multiplicatively. Callers reserve a token with acquire() before every
+    request and report the outcome with record().
+
+    Subclasses can keep the state elsewhere by overriding locked() and clock, see
+    workQueue.SharedTokenBucket.
+    """
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, host, rate, min_rate, max_rate, burst=1):
+        self.host = host
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = self.clock()
+        self.paused_until = 0.0
+        self.average_latency = None
+        self.lock = threading.Lock()
+
+    def locked(self):
+        # Context manager around every read and update of the bucket state
+        return self.lock
+
+    def acquire(self):
+        """
+        Wait until the next request to the host may be sent.
+
+        Tokens are reserved under the lock and the wait happens outside it, so waiting
+        threads are released one by one at the current rate.
+        """
+        with self.locked():
+            now = self.clock()
+            self.refill(now)
+            self.tokens -= 1
+            delay = max(-self.tokens / self.rate, self.paused_until - now)
+        if delay > 0:
+            metrics.observe('rate_limit_wait', delay, host=self.host)
+            time.sleep(delay)
+
+    def try_acquire(self):
+        """
+        Take a token only when one is available right away.
+
+        Returns:
+        - bool: True when the request may be sent now.
+        """
+        with self.locked():
+            now = self.clock()
+            self.refill(now)
+            if self.tokens < 1 or now < self.paused_until:
+                return False
+            self.tokens -= 1
+            return True
+
+    def pause(self, seconds):
+        # Hold every request to the host, e.g. for the Retry-After of a 429
+        with self.locked():
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    def record(self, status, latency):
+        """
+        Adapt the rate to the outcome of a request.
+
+        Parameters:
+        - status (int): HTTP status, or None when the request failed to connect or timed out.
+        - latency (float): Seconds the request took.
+        """
+        with self.locked():
+            if status is None or status in THROTTLE_STATUSES or status >= 500:
+                self.set_rate(self.rate * THROTTLE_DECREASE)
+                metrics.increment('rate_limit_backoffs', host=self.host)
+                return
+            if self.average_latency is not None and latency > LATENCY_THRESHOLD * self.average_latency:
+                self.set_rate(self.rate * LATENCY_DECREASE)
+                metrics.increment('rate_limit_backoffs', host=self.host)
+            else:
+                self.set_rate(self.rate + INCREASE_STEP * self.max_rate)
+            if self.average_latency is None:
+                self.average_latency = latency
+            else:
+                self.average_latency += LATENCY_SMOOTHING * (latency - self.average_latency)
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        # Tokens earned so far count at the old rate
+        self.refill(self.clock())
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+
+
+def get_limiter(host):
+    """
+    Return the limiter shared by every request to host, or None when the host is not throttled.
+
+    A limiter installed with set_limiter takes precedence over RATE_LIMITS.
+    """
+    with limiters_lock:
+        if host not in limiters:
+            limits = RATE_LIMITS.get(host)
+            limiters[host] = AdaptiveTokenBucket(host, **limits) if limits else None
+        return limiters[host]
+
+
+def set_limiter(host, limiter):
+    """
+    Use limiter for every request to host. Any object with acquire(), pause(seconds) and
+    record(status, latency) methods works, e.g. a limiter shared between processes. Hedged
+    requests also need try_acquire(), without it they are not sent.
+    """
+    with limiters_lock:
+        limiters[host] = limiter
+
+
+def reset():
+    # Forget all limiters, so changed RATE_LIMITS take effect
+    with limiters_lock:
+        limiters.clear()
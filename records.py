@@ -0,0 +1,149 @@
+import math
+from array import array
+
+NaN = float('nan')
+
+# Record attribute and sheet header of every Finviz field
+FINVIZ_FIELDS = [
+    ('stock_price', 'Stock Price'),
+    ('dividend_annual', 'Dividend (Annual)'),
+    ('dividend_yield', 'Dividend Yield'),
+    ('dividend_payout_ratio', 'Dividend Payout Ratio'),
+    ('fair_value', 'Fair Value'),
+    ('price_difference', 'Price Difference'),
+    ('eps_ttm', 'EPS (ttm)'),
+    ('pe_ratio', 'P/E'),
+    ('forward_pe', 'Forward P/E'),
+    ('shares_outstanding', 'Shares Outstanding'),
+]
+# Record attribute and sheet header of every Digrin field
+DIGRIN_FIELDS = [
+    ('dgr3', 'DGR3'),
+    ('dgr5', 'DGR5'),
+    ('dgr10', 'DGR10'),
+    ('dgr20', 'DGR20'),
+    ('years_paying_dividends', 'Years Paying Dividends'),
+]
+ALL_FIELDS = FINVIZ_FIELDS + DIGRIN_FIELDS
+# Fields written to the sheet as whole numbers
+INTEGER_FIELDS = {'shares_outstanding', 'years_paying_dividends'}
+HEADERS = ['Ticker'] + [header for _, header in ALL_FIELDS]
+# Value written to the sheet for a missing number
+MISSING = 'N/A'
+
+
+def to_float(value):
+    """
+    Return value as a float, or NaN for 'N/A', None, error messages and other non-numeric values.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return NaN
+    return float(value)
+
+
+def to_cell(name, value):
+    if math.isnan(value):
+        return MISSING
+    return int(value) if name in INTEGER_FIELDS else value
+
+
+class DigrinRecord:
+    """
+    Dividend growth figures of one ticker from Digrin. Missing values are NaN.
+    """
+    __slots__ = tuple(name for name, _ in DIGRIN_FIELDS)
+
+    def __init__(self, **values):
+        for name, _ in DIGRIN_FIELDS:
+            setattr(self, name, to_float(values.get(name)))
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'DigrinRecord({values})'
+
+
+class TickerRecord:
+    """
+    Merged Finviz and Digrin data of one ticker.
+
+    Every field is a float, with NaN for a missing value, so consumers never have to check
+    for 'N/A' strings. Digrin fields stay NaN until merge_digrin is called.
+    """
+    __slots__ = ('ticker',) + tuple(name for name, _ in ALL_FIELDS)
+
+    def __init__(self, ticker, **values):
+        self.ticker = ticker
+        for name, _ in ALL_FIELDS:
+            setattr(self, name, to_float(values.get(name)))
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a record from a dictionary keyed by sheet headers, e.g. a history store row.
+        """
+        return cls(data['Ticker'], **{name: data.get(header) for name, header in ALL_FIELDS})
+
+    def merge_digrin(self, digrin_record):
+        for name, _ in DIGRIN_FIELDS:
+            setattr(self, name, getattr(digrin_record, name))
+        return self
+
+    def to_dict(self, fields=ALL_FIELDS):
+        data = {'Ticker': self.ticker}
+        data.update((header, getattr(self, name)) for name, header in fields)
+        return data
+
+    def to_row(self, fields=ALL_FIELDS):
+        """
+        Return the record as a sheet row in HEADERS order, with MISSING for NaN values.
+
+        Parameters:
+        - fields (list of tuples): (attribute, header) pairs to include, e.g. FINVIZ_FIELDS. Defaults to all fields.
+        """
+        return [self.ticker] + [to_cell(name, getattr(self, name)) for name, _ in fields]
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'TickerRecord({values})'
+
+
+class RecordBatch:
+    """
+    Column store of many TickerRecords: one list of tickers and one array of doubles per field.
+
+    The arrays support the buffer protocol, so numpy.frombuffer(batch.columns['fair_value'])
+    gives a float64 view without copying. valuation.value_batch values a whole batch that way.
+    """
+
+    def __init__(self, records=()):
+        self.tickers = []
+        self.columns = {name: array('d') for name, _ in ALL_FIELDS}
+        self.extend(records)
+
+    def append(self, record):
+        self.tickers.append(record.ticker)
+        for name, column in self.columns.items():
+            column.append(getattr(record, name))
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def record(self, index):
+        return TickerRecord(self.tickers[index],
+                            **{name: column[index] for name, column in self.columns.items()})
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.record(index)
+
+    def to_rows(self):
+        """
+        Return all records as sheet rows in HEADERS order.
+        """
+        columns = [(name, self.columns[name]) for name, _ in ALL_FIELDS]
+        return [[ticker] + [to_cell(name, column[index]) for name, column in columns]
+                for index, ticker in enumerate(self.tickers)]
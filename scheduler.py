@@ -0,0 +1,221 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import httpCache
+from metrics import metrics
+from records import DIGRIN_FIELDS, TickerRecord
+
+# Seconds a source's data stays fresh before the ticker is fetched again
+REFRESH_INTERVALS = {
+    'finviz': 15 * 60,
+    'digrin': 30 * 24 * 60 * 60,
+}
+# Seconds before a failed fetch is tried again
+RETRY_INTERVAL = 10 * 60
+# Only refresh the sources in MARKET_HOURS_SOURCES while the US market is open (holidays are not known)
+MARKET_HOURS_ONLY = True
+MARKET_HOURS_SOURCES = {'finviz'}
+MARKET_TIMEZONE = 'America/New_York'
+MARKET_OPEN = (9, 30)
+MARKET_CLOSE = (16, 0)
+# Most tickers fetched per source before the results are pushed to the sinks
+BATCH_SIZE = 50
+
+
+def next_market_time(timestamp):
+    """
+    Return timestamp when the market is open at that moment, otherwise the next opening time.
+    """
+    moment = datetime.fromtimestamp(timestamp, ZoneInfo(MARKET_TIMEZONE))
+    while True:
+        open_at = moment.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+        close_at = moment.replace(hour=MARKET_CLOSE[0], minute=MARKET_CLOSE[1], second=0, microsecond=0)
+        if moment.weekday() < 5 and moment < close_at:
+            return max(moment, open_at).timestamp()
+        moment = (moment + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def parse_timestamp(value):
+    return datetime.fromisoformat(value).timestamp()
+
+
+class RefreshScheduler:
+    """
+    Long-running refresh of every (ticker, source) pair, stalest first.
+
+    A heap holds the next due time of each pair. Every cycle takes the pairs that are due,
+    at most BATCH_SIZE per source, fetches the sources side by side, and pushes the updated
+    records to the sinks (and the history store), then sleeps until the next pair is due.
+    After a restart every source is due relative to its own last refresh in the history
+    store, or to the ticker's latest stored scrape when no refresh was stored.
+
+    Parameters:
+    - tickers (list of str): Ticker symbols to keep fresh.
+    - sinks (list): Output sinks. Each write receives the records that changed in a cycle.
+    - fetchers (dict): Source name mapped to (fetch function, workers). The finviz function returns
+      a TickerRecord or None, the digrin function a DigrinRecord or None.
+    - intervals (dict): Refresh interval per source in seconds. Defaults to REFRESH_INTERVALS.
+    - history (HistoryStore): Seeds the due times from the latest stored records and stores every update.
+    - market_hours (bool): Apply MARKET_HOURS_ONLY to the sources in MARKET_HOURS_SOURCES.
+    """
+
+    def __init__(self, tickers, sinks, fetchers, intervals=None, history=None, market_hours=MARKET_HOURS_ONLY):
+        self.tickers = tickers
+        self.sinks = sinks
+        self.fetchers = fetchers
+        self.intervals = dict(REFRESH_INTERVALS, **(intervals or {}))
+        self.history = history
+        self.market_hours = market_hours
+        self.records = {}
+        # Digrin data of tickers whose Finviz data has not been fetched yet
+        self.digrin_only = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.stop_event = threading.Event()
+
+        scraped_at = {}
+        refreshed_at = {}
+        if history:
+            wanted = set(tickers)
+            for row in history.latest_per_ticker():
+                if row['Ticker'] in wanted:
+                    self.records[row['Ticker']] = TickerRecord.from_dict(row)
+                    scraped_at[row['Ticker']] = parse_timestamp(row['Scraped At'])
+            refreshed_at = {pair: parse_timestamp(value) for pair, value in history.refresh_times().items()}
+        now = time.time()
+        for ticker in tickers:
+            record = self.records.get(ticker)
+            for source in fetchers:
+                fetched_at = refreshed_at.get((ticker, source), scraped_at.get(ticker))
+                if fetched_at is None or (source == 'digrin' and not has_digrin_data(record)):
+                    self.schedule(ticker, source, now)
+                else:
+                    self.schedule(ticker, source, self.next_due(source, fetched_at))
+
+    def next_due(self, source, fetched_at, interval=None):
+        due = fetched_at + (interval if interval is not None else self.intervals[source])
+        if self.market_hours and MARKET_HOURS_ONLY and source in MARKET_HOURS_SOURCES:
+            due = next_market_time(due)
+        return due
+
+    def schedule(self, ticker, source, due):
+        heapq.heappush(self.heap, (due, next(self.counter), ticker, source))
+
+    def pop_due(self, now):
+        due = {source: [] for source in self.fetchers}
+        deferred = []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            batch = due[entry[3]]
+            if len(batch) < BATCH_SIZE:
+                batch.append(entry[2])
+            else:
+                deferred.append(entry)
+        for entry in deferred:
+            heapq.heappush(self.heap, entry)
+        return {source: tickers for source, tickers in due.items() if tickers}
+
+    def fetch(self, source, tickers):
+        function, workers = self.fetchers[source]
+
+        def fetch_one(ticker):
+            # One broken page must not stop the daemon, it is retried like a failed request
+            try:
+                # A cached page must not be newer than what the interval allows, else it is
+                # marked refreshed without being fetched. A due pair is at least an interval old.
+                with httpCache.max_age(self.intervals[source]):
+                    return function(ticker)
+            except Exception as e:
+                print(f"Error: {source} refresh of {ticker} failed. {e!r}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(zip(tickers, executor.map(fetch_one, tickers)))
+
+    def run_once(self, now=None):
+        """
+        Refresh every pair that is due and push the changed records.
+
+        Returns:
+        - list of TickerRecord: The records that changed, in ticker list order.
+        """
+        now = now or time.time()
+        due = self.pop_due(now)
+        if not due:
+            return []
+        with ThreadPoolExecutor(max_workers=len(due)) as executor:
+            results = {source: executor.submit(self.fetch, source, tickers) for source, tickers in due.items()}
+            results = {source: future.result() for source, future in results.items()}
+
+        changed = set()
+        refreshed = []
+        fetched_at = time.time()
+        for source, pairs in results.items():
+            for ticker, result in pairs:
+                if result is None:
+                    metrics.increment('scheduler_retries', source=source)
+                    self.schedule(ticker, source, self.next_due(source, fetched_at, RETRY_INTERVAL))
+                    continue
+                self.schedule(ticker, source, self.next_due(source, fetched_at))
+                if self.update(ticker, source, result):
+                    changed.add(ticker)
+                refreshed.append((ticker, source))
+            metrics.increment('scheduler_refreshes', len(pairs), source=source)
+
+        records = [self.records[ticker] for ticker in self.tickers if ticker in changed]
+        if self.history and refreshed:
+            self.history.mark_refreshed(refreshed)
+        if records:
+            if self.history:
+                self.history.append(records)
+            for sink in self.sinks:
+                sink.write(records)
+        return records
+
+    def update(self, ticker, source, result):
+        """
+        Merge a fetched source into the ticker's record.
+
+        Returns:
+        - bool: True when the record changed and can be pushed. Digrin data of a ticker without
+          Finviz data is held back until its Finviz fetch succeeds, since pushing it would
+          overwrite the ticker's sheet row with N/A in every Finviz column.
+        """
+        previous = self.records.get(ticker)
+        if source == 'finviz':
+            # Keep the Digrin data, it is refreshed on its own schedule
+            digrin = previous if previous is not None else self.digrin_only.pop(ticker, None)
+            if digrin is not None:
+                result.merge_digrin(digrin)
+            self.records[ticker] = result
+            return True
+        if previous is None:
+            self.digrin_only[ticker] = result
+            return False
+        previous.merge_digrin(result)
+        return True
+
+    def run(self):
+        """
+        Refresh until stop() is called.
+        """
+        while not self.stop_event.is_set():
+            self.run_once()
+            if self.heap:
+                self.stop_event.wait(max(0.0, self.heap[0][0] - time.time()))
+            else:
+                self.stop_event.wait(RETRY_INTERVAL)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def has_digrin_data(record):
+    # A stored record without any Digrin value means the last Digrin fetch failed
+    return record is not None and not all(math.isnan(getattr(record, name)) for name, _ in DIGRIN_FIELDS)
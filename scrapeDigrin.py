@@ -1,58 +1,232 @@
 import re
+from datetime import datetime
+from html.parser import HTMLParser
+
 import requests
-from bs4 import BeautifulSoup
+import httpCache
+import streamExtract
+from metrics import metrics
+from records import DigrinRecord
+
+DIGRIN_DETAIL_URL = 'https://www.digrin.com/stocks/detail/{ticker}'
+DIGRIN_LABELS = ('DGR3', 'DGR5', 'DGR10', 'DGR20', 'Years Paying Dividends')
+# A label followed by the contents of the next <strong> element, for every label at once
+DIGRIN_PATTERN = re.compile(
+    r'(' + '|'.join(re.escape(label) for label in DIGRIN_LABELS) + r').*?<strong[^>]*>(.*?)</strong>', re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]*>')
+# Read Digrin pages in chunks and stop at the last value, instead of downloading them through the cache
+STREAM_PAGES = False
+# Column headers of the dividend history table
+DIVIDEND_COLUMNS = ('Ex-dividend date', 'Payment date', 'Amount')
+# Accepted date formats in the dividend history table, stored as YYYY-MM-DD
+DIVIDEND_DATE_FORMATS = ('%Y-%m-%d', '%b %d, %Y', '%d.%m.%Y')
+
+
+def extract_digrin_values(html):
+    """
+    Extract the DGR3, DGR5, DGR10, DGR20 and Years Paying Dividends values from a Digrin page.
+
+    Parameters:
+    - html (str): Raw HTML of a Digrin stock detail page.
+
+    Returns:
+    - dict: Label mapped to its text value, or 'N/A' when the label is missing.
+    """
+    values = {}
+    with metrics.timer('parse', source='digrin'):
+        for match in DIGRIN_PATTERN.finditer(html):
+            values.setdefault(match.group(1), TAG_PATTERN.sub('', match.group(2)).strip())
+            if len(values) == len(DIGRIN_LABELS):
+                break
+    return {label: values.get(label, 'N/A') for label in DIGRIN_LABELS}
+
+
+class DigrinStreamExtractor:
+    """
+    Incremental version of extract_digrin_values, for streamExtract.stream_extract.
+
+    Each label is matched once its <strong> value has fully arrived, and done is set when
+    every label has a value.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        # Position after the last complete match, where the next search starts
+        self.position = 0
+        self.found = {}
+        self.done = False
+
+    def feed(self, text):
+        self.buffer += text
+        for match in DIGRIN_PATTERN.finditer(self.buffer, self.position):
+            self.found.setdefault(match.group(1), TAG_PATTERN.sub('', match.group(2)).strip())
+            self.position = match.end()
+        self.done = len(self.found) == len(DIGRIN_LABELS)
+
+    def close(self):
+        pass
+
+    def values(self):
+        return {label: self.found.get(label, 'N/A') for label in DIGRIN_LABELS}
+
+
+class DividendTableExtractor(HTMLParser):
+    """
+    Incremental reader of the dividend history table of a Digrin page, for streamExtract.stream_extract.
+
+    The table lists the newest payment first, so reading stops at the first payment older than
+    since: everything after it is stored already. Without since the whole table is read.
+
+    Parameters:
+    - since (str): Ex-dividend date (YYYY-MM-DD) of the newest stored payment, or None.
+    """
+
+    def __init__(self, since=None):
+        super().__init__()
+        self.since = since
+        self.payments = []
+        self.done = False
+        self.headers = []
+        self.in_table = False
+        # Text pieces of the th or td being read, None outside a cell
+        self.cell = None
+        self.row = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('th', 'td'):
+            self.cell = []
+        elif tag == 'table' and not self.in_table:
+            self.headers = []
+
+    def handle_endtag(self, tag):
+        if tag in ('th', 'td') and self.cell is not None:
+            text = ''.join(self.cell).strip()
+            self.cell = None
+            if tag == 'th':
+                self.headers.append(text)
+                if text == DIVIDEND_COLUMNS[0]:
+                    self.in_table = True
+            elif self.in_table:
+                self.row.append(text)
+        elif tag == 'tr':
+            if self.in_table and self.row:
+                self.finish_row(self.row)
+            self.row = []
+        elif tag == 'table' and self.in_table:
+            self.done = True
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
 
+    def finish_row(self, cells):
+        values = dict(zip(self.headers, cells))
+        ex_date = parse_dividend_date(values.get(DIVIDEND_COLUMNS[0], ''))
+        amount = extract_amount(values.get(DIVIDEND_COLUMNS[2], ''))
+        if ex_date is None or amount is None:
+            return
+        # Payments on the newest stored date are read again, storing them twice is harmless
+        if self.since and ex_date < self.since:
+            self.done = True
+            return
+        self.payments.append((ex_date, parse_dividend_date(values.get(DIVIDEND_COLUMNS[1], '')), amount))
 
-def fetch_digrin_data(ticker):
-    url = f'https://www.digrin.com/stocks/detail/{ticker}'
 
+def parse_dividend_date(text):
+    for date_format in DIVIDEND_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def extract_amount(text):
     try:
-        # Send HTTP request with a custom User-Agent header
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-
-        # Parse HTML content
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        dgr3 = get_valueDigrin(soup, 'DGR3')
-        dgr5 = get_valueDigrin(soup, 'DGR5')
-        dgr10 = get_valueDigrin(soup, 'DGR10')
-        dgr20 = get_valueDigrin(soup, 'DGR20')
-        divYears = get_valueDigrin(soup, 'Years Paying Dividends')
-
-        return {
-            'DGR3': dgr3,
-            'DGR5': dgr5,
-            'DGR10': dgr10,
-            'DGR20': dgr20,
-            'Years Paying Dividends': divYears
-        }
-    except requests.RequestException as e:
-        print(f"Error: Unable to fetch Digrin data for {ticker}. {e}")
+        return float(text.replace('$', '').replace(',', ''))
+    except ValueError:
         return None
 
 
-def get_valueDigrin(soup, label):
-    pattern = re.compile(fr'{label}.*?>(.*?)<\/strong>', re.DOTALL)
-    match = pattern.search(str(soup))
-    if match:
-        return match.group(1).strip().replace('<strong>', '').replace('</strong>', '')
-    return 'N/A'
+def fetch_dividend_payments(ticker_symbol, since=None):
+    """
+    Read the dividend payments of a ticker from its Digrin page, newest first.
+
+    The page is streamed, so with since the download stops at the first payment that is
+    already stored.
+
+    Parameters:
+    - ticker_symbol (str): Ticker symbol.
+    - since (str): Ex-dividend date (YYYY-MM-DD) of the newest stored payment, or None.
+
+    Returns:
+    - list of tuples: (ex_date, payment_date, amount) of every payment on or after since,
+      or None when the page could not be fetched.
+    """
+    stock_url = DIGRIN_DETAIL_URL.format(ticker=ticker_symbol)
+    try:
+        return streamExtract.stream_extract(stock_url, DividendTableExtractor(since)).payments
+    except requests.exceptions.RequestException as e:
+        metrics.increment('failures', source='digrin')
+        print(f"Error fetching dividend history: {e}")
+        return None
+
+
+def ingest_dividend_history(ticker_symbol, store):
+    """
+    Add the payments of a ticker that are newer than its stored ones to a DividendStore.
+
+    Returns:
+    - int: Number of new payments, or None when the page could not be fetched.
+    """
+    payments = fetch_dividend_payments(ticker_symbol, store.latest_ex_date(ticker_symbol))
+    if payments is None:
+        return None
+    added = store.add(ticker_symbol, payments)
+    metrics.increment('dividend_payments_added', added)
+    return added
+
+
+def extract_percentage(text):
+    text = text.replace('%', '').replace(',', '')
+    return round(float(text) / 100, 4) if text.replace('.', '').isdigit() else None
+
+
+def get_digrin_data(ticker_symbol):
+    stock_url = DIGRIN_DETAIL_URL.format(ticker=ticker_symbol)
+    try:
+        # Extract DGR3, DGR5, DGR10, DGR20 and "Years Paying Dividends" values
+        if STREAM_PAGES:
+            values = streamExtract.stream_extract(stock_url, DigrinStreamExtractor()).values()
+        else:
+            # Fetch the HTML content
+            page = httpCache.fetch(stock_url)
+            values = page.get_parsed('digrin-values', extract_digrin_values)
+
+        years_paying_dividends = values['Years Paying Dividends']
+
+        return DigrinRecord(
+            dgr3=extract_percentage(values['DGR3']),
+            dgr5=extract_percentage(values['DGR5']),
+            dgr10=extract_percentage(values['DGR10']),
+            dgr20=extract_percentage(values['DGR20']),
+            years_paying_dividends=int(years_paying_dividends) if years_paying_dividends != 'N/A' else None
+        )
+
+    except requests.exceptions.RequestException as e:
+        metrics.increment('failures', source='digrin')
+        print(f"Error fetching data: {e}")
+        return None
+    except (ValueError, TypeError) as e:
+        metrics.increment('failures', source='digrin')
+        print(f"Error processing data: {e}")
+        return None
 
 
 def main():
-    # ticker_symbol = input("Enter the ticker symbol (e.g., T): ").upper()
-    ticker_symbol = "T"
-    digrin_data = fetch_digrin_data(ticker_symbol)
-
-    if digrin_data:
-        print(f"\nDigrin Data for {ticker_symbol}:")
-        for key, value in digrin_data.items():
-            print(f"{key}: {value}")
-    else:
-        print("Exiting due to an error.")
+    # Same as: python cli.py digrin T
+    import cli
+    cli.main(['digrin', 'T'])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+import re
+
+import numpy as np
+
+from records import ALL_FIELDS, TickerRecord
+
+# Fields with precomputed sorted indexes. Other fields can still be filtered and sorted on, by a full scan.
+INDEXED_FIELDS = ['fair_value', 'price_difference', 'dividend_yield', 'dividend_payout_ratio',
+                  'dgr3', 'dgr5', 'dgr10', 'dgr20', 'pe_ratio', 'forward_pe']
+# Attribute or sheet header, case-insensitive, mapped to the record attribute
+FIELD_NAMES = {key.lower(): name for name, header in ALL_FIELDS for key in (name, header)}
+# 'Dividend Yield > 3%', 'dgr5>=0.05', 'P/E < 20'. A % suffix divides the value by 100.
+CONDITION_PATTERN = re.compile(r'^\s*(.+?)\s*(<=|>=|==|!=|<|>|=)\s*(-?\d+(?:\.\d*)?|-?\.\d+)\s*(%?)\s*$')
+
+
+def resolve_field(name):
+    field = FIELD_NAMES.get(name.strip().lower())
+    if field is None:
+        raise ValueError(f"Unknown field: {name!r}")
+    return field
+
+
+def parse_condition(text):
+    """
+    Parse a condition like 'Dividend Yield > 3%' into (attribute, operator, value).
+
+    Raises:
+    - ValueError: When the condition or its field is not understood.
+    """
+    match = CONDITION_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Invalid condition: {text!r}")
+    name, operator, value, percent = match.groups()
+    value = float(value) / 100 if percent else float(value)
+    return resolve_field(name), '==' if operator == '=' else operator, value
+
+
+def parse_sort(text):
+    """
+    Parse a sort key like '-Price Difference' into (attribute, descending). A leading '-' sorts descending.
+    """
+    text = text.strip()
+    return resolve_field(text.lstrip('-')), text.startswith('-')
+
+
+class ScreenIndex:
+    """
+    Column store of ticker records with sorted indexes, for filter, sort and top-N queries.
+
+    Every field becomes a float array (NaN for missing values). For the INDEXED_FIELDS an
+    ascending and a descending order are computed once, so range conditions are two binary
+    searches and a sorted top-N is a scan of the order until N matches are found.
+    Missing values never match a condition and always sort last.
+
+    Parameters:
+    - records (list of TickerRecord): Merged records, e.g. the latest of every ticker in the history store.
+    - indexed_fields (list of str): Attributes to build sorted indexes for.
+    """
+
+    def __init__(self, records, indexed_fields=INDEXED_FIELDS):
+        self.records = list(records)
+        size = len(self.records)
+        self.columns = {name: np.fromiter((getattr(record, name) for record in self.records), float, size)
+                        for name, _ in ALL_FIELDS}
+        self.orders = {}
+        self.sorted_values = {}
+        self.valid_counts = {}
+        for name in indexed_fields:
+            column = self.columns[name]
+            # argsort puts NaN last, also for the negated column
+            ascending = np.argsort(column, kind='stable')
+            self.orders[(name, False)] = ascending
+            self.orders[(name, True)] = np.argsort(-column, kind='stable')
+            self.sorted_values[name] = column[ascending]
+            self.valid_counts[name] = size - int(np.isnan(column).sum())
+
+    def __len__(self):
+        return len(self.records)
+
+    def select(self, name, operator, value):
+        """
+        Return a boolean mask of the records whose attribute name satisfies the condition.
+        """
+        if name not in self.sorted_values:
+            column = self.columns[name]
+            with np.errstate(invalid='ignore'):
+                return {'<': column < value, '<=': column <= value, '>': column > value, '>=': column >= value,
+                        '==': column == value, '!=': (column != value) & ~np.isnan(column)}[operator]
+
+        values = self.sorted_values[name]
+        valid = self.valid_counts[name]
+        left = int(np.searchsorted(values[:valid], value, side='left'))
+        right = int(np.searchsorted(values[:valid], value, side='right'))
+        start, end = {'<': (0, left), '<=': (0, right), '>': (right, valid), '>=': (left, valid),
+                      '==': (left, right), '!=': (left, right)}[operator]
+        mask = np.zeros(len(self.records), dtype=bool)
+        mask[self.orders[(name, False)][start:end]] = True
+        if operator == '!=':
+            mask[self.orders[(name, False)][:valid]] ^= True
+        return mask
+
+    def order(self, name, descending=False):
+        if (name, descending) not in self.orders:
+            column = -self.columns[name] if descending else self.columns[name]
+            return np.argsort(column, kind='stable')
+        return self.orders[(name, descending)]
+
+    def query(self, where=(), sort=None, descending=False, top=None):
+        """
+        Return the records that satisfy every condition, sorted and cut to the first top.
+
+        Parameters:
+        - where (iterable of tuples): (attribute, operator, value) conditions, see parse_condition.
+          Operators are <, <=, >, >=, == and !=.
+        - sort (str): Attribute to sort on. Without it the records keep their original order.
+        - descending (bool): Sort from high to low.
+        - top (int): Maximum number of records to return.
+
+        Returns:
+        - list of TickerRecord
+        """
+        mask = np.ones(len(self.records), dtype=bool)
+        for name, operator, value in where:
+            mask &= self.select(name, operator, value)
+        if sort and top is not None:
+            positions = first_matches(self.order(sort, descending), mask, top)
+        elif sort:
+            order = self.order(sort, descending)
+            positions = order[mask[order]]
+        else:
+            positions = np.flatnonzero(mask)
+        if top is not None:
+            positions = positions[:top]
+        return [self.records[position] for position in positions]
+
+
+def first_matches(order, mask, count):
+    # Scan order in growing blocks and stop once count positions match the mask
+    found = []
+    matched = 0
+    start = 0
+    block = max(64, 4 * count)
+    while start < len(order) and matched < count:
+        positions = order[start:start + block]
+        positions = positions[mask[positions]]
+        found.append(positions)
+        matched += len(positions)
+        start += block
+        block *= 2
+    return np.concatenate(found)[:count] if found else order[:0]
+
+
+def load_latest_records(history, tickers=None):
+    """
+    Return the latest stored record of every ticker in a HistoryStore, optionally only of tickers.
+    """
+    wanted = set(tickers) if tickers else None
+    return [TickerRecord.from_dict(row) for row in history.latest_per_ticker()
+            if wanted is None or row['Ticker'] in wanted]
+
+
+def screen(records, where=(), sort=None, top=None):
+    """
+    One-off query over records with conditions and a sort key in text form.
+
+        screen(records, ['Dividend Yield > 3%', 'DGR5 > 5%'], '-Price Difference', 20)
+
+    Build a ScreenIndex once and call its query method to run many queries over the same records.
+    """
+    sort_field, descending = parse_sort(sort) if sort else (None, False)
+    return ScreenIndex(records).query([parse_condition(condition) for condition in where], sort_field, descending, top)
@@ -0,0 +1,245 @@
+import threading
+
+from metrics import metrics
+from records import ALL_FIELDS
+
+SCOPE = ["https://spreadsheets.google.com/feeds",
+         "https://www.googleapis.com/auth/drive"]
+KEY_FILE = 'key.json'
+SPREADSHEET_NAME = 'Dividend aandelen Aankopen'
+SHEET_NAME = 'IntermediateTable'
+
+
+class SheetsGateway:
+    """
+    One authorized gspread client, shared by everything that reads or writes Google Sheets.
+
+    The service account is authorized once. The client keeps its OAuth token and only
+    refreshes it when it expires. Spreadsheets and worksheets are opened once and kept
+    by name, so opening the same sheet again needs no Drive search.
+
+    gspread and oauth2client are only imported when the first sheet is opened, so runs
+    that never touch Google Sheets do not pay for loading them.
+    """
+
+    def __init__(self, key_file=KEY_FILE, scope=SCOPE):
+        self.key_file = key_file
+        self.scope = scope
+        self.client = None
+        self.spreadsheets = {}
+        self.worksheets = {}
+        self.lock = threading.RLock()
+
+    def get_client(self):
+        with self.lock:
+            if self.client is None:
+                import gspread
+                from oauth2client.service_account import ServiceAccountCredentials
+                credentials = ServiceAccountCredentials.from_json_keyfile_name(
+                    self.key_file, self.scope)
+                self.client = gspread.authorize(credentials)
+            return self.client
+
+    def open_spreadsheet(self, spreadsheet_name):
+        with self.lock:
+            if spreadsheet_name not in self.spreadsheets:
+                import gspread
+                gc = self.get_client()
+                try:
+                    spreadsheet = gc.open(spreadsheet_name)
+                except gspread.SpreadsheetNotFound:
+                    # If the spreadsheet does not exist, create a new one
+                    spreadsheet = gc.create(spreadsheet_name)
+                self.spreadsheets[spreadsheet_name] = spreadsheet
+            return self.spreadsheets[spreadsheet_name]
+
+    def get_worksheet(self, spreadsheet_name, sheet_name, rows=1, cols=1):
+        """
+        Return a worksheet, creating the spreadsheet and the worksheet when they do not exist.
+
+        Parameters:
+        - spreadsheet_name (str): Name of the Google Sheets spreadsheet.
+        - sheet_name (str): Name of the sheet within the spreadsheet.
+        - rows (int), cols (int): Size of the worksheet if it has to be created.
+
+        Returns:
+        - gspread.Worksheet
+        """
+        key = (spreadsheet_name, sheet_name)
+        with self.lock:
+            if key not in self.worksheets:
+                import gspread
+                spreadsheet = self.open_spreadsheet(spreadsheet_name)
+                try:
+                    worksheet = spreadsheet.worksheet(sheet_name)
+                except gspread.WorksheetNotFound:
+                    worksheet = spreadsheet.add_worksheet(sheet_name, rows, cols)
+                self.worksheets[key] = worksheet
+            return self.worksheets[key]
+
+    def close(self):
+        with self.lock:
+            if self.client is not None:
+                self.client.session.close()
+            self.client = None
+            self.spreadsheets = {}
+            self.worksheets = {}
+
+
+default_gateway = SheetsGateway()
+
+
+def get_gateway():
+    return default_gateway
+
+
+def sheet_values_equal(current_value, new_value):
+    if new_value is None:
+        new_value = ''
+    if isinstance(current_value, (int, float)) and isinstance(new_value, (int, float)):
+        return float(current_value) == float(new_value)
+    return str(current_value) == str(new_value)
+
+
+def diff_sheet_values(current_values, new_values, first_row=1):
+    """
+    Compare the current sheet contents with the rows that should be there.
+
+    Parameters:
+    - current_values (list of lists): Values read from the sheet, starting at column A of first_row. Rows may be shorter than the new ones.
+    - new_values (list of lists): Values that should be in the sheet, starting at column A of first_row.
+    - first_row (int): Sheet row number of the first row in both lists.
+
+    Returns:
+    - list of dictionaries: One {'range', 'values'} entry per run of changed cells in a row, ready for batch_update.
+    """
+    from gspread.utils import rowcol_to_a1
+
+    changed_ranges = []
+    for row_index, new_row in enumerate(new_values):
+        current_row = current_values[row_index] if row_index < len(current_values) else []
+        column_index = 0
+        while column_index < len(new_row):
+            current_value = current_row[column_index] if column_index < len(current_row) else ''
+            if sheet_values_equal(current_value, new_row[column_index]):
+                column_index += 1
+                continue
+
+            # Extend the range over every following changed cell
+            run_end = column_index + 1
+            while run_end < len(new_row) and not sheet_values_equal(
+                    current_row[run_end] if run_end < len(current_row) else '', new_row[run_end]):
+                run_end += 1
+
+            start_cell = rowcol_to_a1(first_row + row_index, column_index + 1)
+            end_cell = rowcol_to_a1(first_row + row_index, run_end)
+            changed_ranges.append({'range': f'{start_cell}:{end_cell}',
+                                   'values': [new_row[column_index:run_end]]})
+            column_index = run_end
+    return changed_ranges
+
+
+def write_financial_data_to_google_sheets(data_list, spreadsheet_name, sheet_name, incremental=False, gateway=None, start_row=2,
+                                          fields=ALL_FIELDS):
+    """
+    Write a list of ticker records to a Google Sheets spreadsheet.
+
+    Parameters:
+    - data_list (list of TickerRecord): Merged financial data for each ticker.
+    - spreadsheet_name (str): Name of the Google Sheets spreadsheet.
+    - sheet_name (str): Name of the sheet within the spreadsheet.
+    - incremental (bool): Read the sheet once and only send the cells that changed, in a single batch_update.
+    - gateway (SheetsGateway): Authorized Sheets connection to use. Defaults to the shared gateway.
+    - start_row (int): Sheet row of the first ticker. The header row is only checked when writing from row 2.
+    - fields (list of tuples): (attribute, header) pairs of the columns after Ticker. Defaults to all fields.
+
+    Returns:
+    - None
+    """
+    from gspread.utils import rowcol_to_a1
+
+    with metrics.timer('sheets_write', source='sheets'):
+        # Write data to the sheet
+        headers = ['Ticker'] + [header for _, header in fields]
+
+        gateway = gateway or get_gateway()
+        worksheet = gateway.get_worksheet(
+            spreadsheet_name, sheet_name, 1, len(headers))
+
+        # Create a list of lists for the new data
+        new_data_values = [ticker_data.to_row(fields) for ticker_data in data_list]
+        end_row = start_row + len(new_data_values) - 1
+
+        if incremental:
+            # The first chunk also compares the header row
+            first_row = 1 if start_row == 2 else start_row
+            new_values = ([headers] if start_row == 2 else []) + new_data_values
+
+            # Read the header and data region once, limited to the current grid size
+            current_values = []
+            last_row = min(end_row, worksheet.row_count)
+            last_column = min(len(headers), worksheet.col_count)
+            if first_row <= last_row:
+                current_values = worksheet.get(f'A{first_row}:{rowcol_to_a1(last_row, last_column)}',
+                                               value_render_option='UNFORMATTED_VALUE')
+
+            changed_ranges = diff_sheet_values(current_values, new_values, first_row)
+            if changed_ranges:
+                worksheet.batch_update(changed_ranges)
+            return
+
+        # Make sure the header row exists
+        if start_row == 2 and worksheet.row_values(1) != headers:
+            worksheet.update('A1', [headers])
+
+        # Get the range of cells to update
+        # Assuming data starts from the second row (excluding headers)
+        start_cell = f'A{start_row}'
+        # End cell based on number of rows and columns
+        end_cell = rowcol_to_a1(end_row, len(headers))
+
+        # Update the entire range with the new data
+        worksheet.update(f'{start_cell}:{end_cell}', new_data_values)
+
+
+def write_rows_at(rows, spreadsheet_name, sheet_name, gateway=None, fields=ALL_FIELDS):
+    """
+    Overwrite individual sheet rows with a single batch_update.
+
+    Parameters:
+    - rows (list of tuples): (sheet row number, TickerRecord) pairs.
+    - spreadsheet_name (str), sheet_name (str): Target worksheet.
+    - gateway (SheetsGateway): Authorized Sheets connection to use. Defaults to the shared gateway.
+    - fields (list of tuples): (attribute, header) pairs of the columns after Ticker.
+    """
+    from gspread.utils import rowcol_to_a1
+
+    with metrics.timer('sheets_write', source='sheets'):
+        gateway = gateway or get_gateway()
+        worksheet = gateway.get_worksheet(spreadsheet_name, sheet_name, 1, len(fields) + 1)
+        worksheet.batch_update([{'range': f'A{row}:{rowcol_to_a1(row, len(fields) + 1)}',
+                                 'values': [record.to_row(fields)]} for row, record in rows])
+
+
+def clear_rows_from(first_row, spreadsheet_name, sheet_name, gateway=None, fields=ALL_FIELDS):
+    """
+    Clear the field columns of every row from first_row to the end of the worksheet.
+    """
+    from gspread.utils import rowcol_to_a1
+
+    with metrics.timer('sheets_write', source='sheets'):
+        gateway = gateway or get_gateway()
+        worksheet = gateway.get_worksheet(spreadsheet_name, sheet_name, 1, len(fields) + 1)
+        if first_row <= worksheet.row_count:
+            worksheet.batch_clear([f'A{first_row}:{rowcol_to_a1(worksheet.row_count, len(fields) + 1)}'])
+
+
+def getTickers(gateway=None, spreadsheet_name=SPREADSHEET_NAME, sheet_name=SHEET_NAME):
+    with metrics.timer('get_tickers', source='sheets'):
+        # Select or create the sheet
+        gateway = gateway or get_gateway()
+        worksheet = gateway.get_worksheet(spreadsheet_name, sheet_name)
+
+        # Get values from the first column (excluding the first row)
+        column_values = worksheet.col_values(1)[1:]
+    return column_values
@@ -0,0 +1,137 @@
+import csv
+import json
+import math
+import sys
+from pprint import pprint as pp
+
+from records import ALL_FIELDS, INTEGER_FIELDS
+from sheetsGateway import (SHEET_NAME, SPREADSHEET_NAME, clear_rows_from, write_financial_data_to_google_sheets,
+                           write_rows_at)
+
+# Every sink has write(records), called with each finished list of TickerRecords in ticker
+# order, and close(), called once after the last write.
+
+
+def open_output(path):
+    # '-' writes to standard output, so results can be piped into other tools
+    if path == '-':
+        return sys.stdout
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def close_output(file):
+    if file is not sys.stdout:
+        file.close()
+
+
+class StdoutSink:
+    """
+    Pretty-print every record as a dictionary.
+    """
+
+    def __init__(self, fields=ALL_FIELDS):
+        self.fields = fields
+
+    def write(self, records):
+        for record in records:
+            pp(record.to_dict(self.fields))
+
+    def close(self):
+        pass
+
+
+class CsvSink:
+    """
+    Write records to a CSV file with a header row, formatted like the sheet ('N/A' for missing values).
+    """
+
+    def __init__(self, path, fields=ALL_FIELDS):
+        self.fields = fields
+        self.file = open_output(path)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['Ticker'] + [header for _, header in fields])
+
+    def write(self, records):
+        self.writer.writerows(record.to_row(self.fields) for record in records)
+        self.file.flush()
+
+    def close(self):
+        close_output(self.file)
+
+
+class JsonLinesSink:
+    """
+    Write one JSON object per record, keyed by sheet header, with null for missing values.
+    """
+
+    def __init__(self, path, fields=ALL_FIELDS):
+        self.fields = fields
+        self.file = open_output(path)
+
+    def write(self, records):
+        for record in records:
+            data = {'Ticker': record.ticker}
+            for name, header in self.fields:
+                value = getattr(record, name)
+                if math.isnan(value):
+                    value = None
+                elif name in INTEGER_FIELDS:
+                    value = int(value)
+                data[header] = value
+            self.file.write(json.dumps(data) + '\n')
+        self.file.flush()
+
+    def close(self):
+        close_output(self.file)
+
+
+class SheetsSink:
+    """
+    Write records to a Google Sheets worksheet, every write continuing below the previous one.
+
+    With row_tickers, a ticker that is already in the sheet (or was written before) is
+    overwritten in its own row instead, so a long-running scheduler can push updated
+    records to the same table.
+
+    Parameters:
+    - spreadsheet_name (str), sheet_name (str): Target worksheet, created when it does not exist.
+    - fields (list of tuples): (attribute, header) pairs of the columns after Ticker.
+    - gateway (SheetsGateway): Authorized Sheets connection. Defaults to the shared gateway.
+    - incremental (bool): Only send the cells that changed.
+    - row_tickers (list of str): Tickers in the sheet, in row order from row 2. Enables overwriting rows.
+    - clear_below (bool): Clear the rows below the last written one on close, so a shorter
+      result, e.g. of a screen, replaces a longer one completely.
+    """
+
+    def __init__(self, spreadsheet_name=SPREADSHEET_NAME, sheet_name=SHEET_NAME, fields=ALL_FIELDS,
+                 gateway=None, incremental=True, row_tickers=None, clear_below=False):
+        self.spreadsheet_name = spreadsheet_name
+        self.sheet_name = sheet_name
+        self.fields = fields
+        self.gateway = gateway
+        self.incremental = incremental
+        self.overwrite_rows = row_tickers is not None
+        self.clear_below = clear_below
+        # Sheet row of every ticker in the sheet or written so far
+        self.rows = {}
+        for row, ticker in enumerate(row_tickers or [], start=2):
+            self.rows.setdefault(ticker, row)
+        self.next_row = 2 + len(row_tickers or [])
+
+    def write(self, records):
+        known = self.rows if self.overwrite_rows else {}
+        updates = [(known[record.ticker], record) for record in records if record.ticker in known]
+        new_records = [record for record in records if record.ticker not in known]
+        if updates:
+            write_rows_at(updates, self.spreadsheet_name, self.sheet_name, self.gateway, self.fields)
+        if new_records:
+            write_financial_data_to_google_sheets(
+                new_records, self.spreadsheet_name, self.sheet_name, incremental=self.incremental,
+                gateway=self.gateway, start_row=self.next_row, fields=self.fields)
+            for record in new_records:
+                self.rows.setdefault(record.ticker, self.next_row)
+                self.next_row += 1
+
+    def close(self):
+        if self.clear_below:
+            clear_rows_from(self.next_row, self.spreadsheet_name, self.sheet_name, self.gateway, self.fields)
@@ -0,0 +1,120 @@
+import codecs
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+import httpClient
+from metrics import metrics
+
+# Bytes read from the response at a time
+CHUNK_SIZE = 8 * 1024
+
+
+class SnapshotStreamParser(HTMLParser):
+    """
+    Incremental reader of the Finviz snapshot table.
+
+    Builds the same label to value map as MainScraper.build_snapshot_index from the td cells
+    with the snapshot-td2 class, while the page is still arriving. done is set as soon as every
+    wanted label has a value, or when the table holding the snapshot cells ends.
+
+    Parameters:
+    - labels (iterable of str): Snapshot labels the caller needs.
+    """
+
+    def __init__(self, labels):
+        super().__init__()
+        self.labels = set(labels)
+        self.snapshot = {}
+        self.done = False
+        # Stripped text nodes of the snapshot cell being read, None outside a snapshot cell
+        self.cell = None
+        # A text node split over two chunks arrives in pieces, so it is stripped once complete
+        self.text = []
+        self.previous_cell = None
+        self.table_depth = 0
+        self.snapshot_table_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        self.finish_text()
+        if tag == 'table':
+            self.table_depth += 1
+        elif tag in ('td', 'tr'):
+            # A new cell or row also ends a cell without a closing tag
+            self.finish_cell()
+            if tag == 'td' and 'snapshot-td2' in (dict(attrs).get('class') or '').split():
+                self.cell = []
+                if self.snapshot_table_depth is None:
+                    self.snapshot_table_depth = self.table_depth
+
+    def handle_endtag(self, tag):
+        self.finish_text()
+        if tag in ('td', 'tr'):
+            self.finish_cell()
+        elif tag == 'table':
+            self.finish_cell()
+            if self.table_depth == self.snapshot_table_depth:
+                self.done = True
+            self.table_depth -= 1
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.text.append(data)
+
+    def finish_text(self):
+        if self.text and self.cell is not None:
+            self.cell.append(''.join(self.text).strip())
+            self.text = []
+
+    def finish_cell(self):
+        if self.cell is None:
+            return
+        self.finish_text()
+        text = ''.join(self.cell)
+        self.cell = None
+        # Every cell is the value of the label in the cell before it. The first occurrence wins.
+        if self.previous_cell and self.previous_cell not in self.snapshot:
+            self.snapshot[self.previous_cell] = text
+        self.previous_cell = text
+        if self.labels.issubset(self.snapshot):
+            self.done = True
+
+
+def stream_extract(url, extractor, headers=None):
+    """
+    Download a page in chunks and feed them to extractor until it is done.
+
+    The connection is closed as soon as extractor.done is set, so the rest of the page is
+    never transferred. The HTTP cache is not used, since only part of the body is read.
+
+    Parameters:
+    - url (str): URL to fetch.
+    - extractor: Object with feed(text), close() and a done attribute, e.g. a SnapshotStreamParser.
+    - headers (dict): Request headers.
+
+    Returns:
+    - The extractor, after it has seen everything it needed.
+
+    Raises:
+    - requests.RequestException: When the request fails or the server returns an error status.
+    """
+    host = urlparse(url).hostname
+    received = 0
+    with metrics.timer('stream_extract', host=host):
+        response = httpClient.get(url, headers=headers, stream=True)
+        try:
+            response.raise_for_status()
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            for chunk in response.iter_content(CHUNK_SIZE):
+                received += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+                if extractor.done:
+                    metrics.increment('stream_early_stops', host=host)
+                    break
+            else:
+                extractor.feed(decoder.decode(b'', final=True))
+                extractor.close()
+        finally:
+            # Closing an unfinished response drops the connection instead of reading the rest
+            response.close()
+            metrics.increment('bytes_downloaded', received, host=host)
+    return extractor
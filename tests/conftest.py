@@ -0,0 +1,75 @@
+"""
+Shared fixtures of the offline test suite.
+
+Nothing here reaches the network: pages come from benchmarks/fixtures, either read directly
+or replayed by the benchmarks' FixtureServer on 127.0.0.1.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The scraper modules and the fixture server are plain scripts, not packages
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import httpCache  # noqa: E402
+import MainScraper  # noqa: E402
+import rateLimiter  # noqa: E402
+import scrapeDigrin  # noqa: E402
+from fixtureServer import FIXTURE_NAMES, FixtureServer, fixture_name, load_fixtures  # noqa: E402
+
+
+def tickers_for(name, count=1):
+    """
+    Return count ticker symbols the FixtureServer answers with the named fixture.
+    """
+    tickers = []
+    number = 0
+    while len(tickers) < count:
+        ticker = f'T{number:04d}'
+        if fixture_name(ticker) == name:
+            tickers.append(ticker)
+        number += 1
+    return tickers
+
+
+@pytest.fixture(scope='session')
+def tickers():
+    return tickers_for
+
+
+@pytest.fixture(scope='session')
+def finviz_pages():
+    return dict(zip(FIXTURE_NAMES, (page.decode('utf-8') for page in load_fixtures('finviz'))))
+
+
+@pytest.fixture(scope='session')
+def digrin_pages():
+    return dict(zip(FIXTURE_NAMES, (page.decode('utf-8') for page in load_fixtures('digrin'))))
+
+
+@pytest.fixture(scope='session')
+def fixture_server():
+    server = FixtureServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def offline(fixture_server, tmp_path, monkeypatch):
+    """
+    Point the fetchers at the fixture server, without HTTP cache or rate limits, and run in
+    an empty directory, so history, journal and report files never touch the working tree.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(MainScraper, 'FINVIZ_QUOTE_URL', fixture_server.base_url + '/quote.ashx?t={ticker}')
+    monkeypatch.setattr(scrapeDigrin, 'DIGRIN_DETAIL_URL', fixture_server.base_url + '/stocks/detail/{ticker}')
+    monkeypatch.setattr(httpCache, 'CACHE_ENABLED', False)
+    monkeypatch.setattr(rateLimiter, 'RATE_LIMITS', {})
+    rateLimiter.reset()
+    yield fixture_server
+    rateLimiter.reset()
+    fixture_server.queued.clear()
+    fixture_server.etags = False
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+import MainScraper
+from checkpoint import CheckpointJournal
+from historyStore import HistoryStore
+from records import TickerRecord
+
+
+class ListSink:
+    def __init__(self):
+        self.records = []
+
+    def write(self, records):
+        self.records.extend(records)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'checkpoint.jsonl')
+
+
+def test_resume_restores_done_and_digrin_failures(journal_path):
+    journal = CheckpointJournal(journal_path)
+    journal.record_done(TickerRecord('AAA', stock_price=10.0, dgr5=0.05))
+    journal.record_failed('BBB', 'finviz')
+    journal.record_failed('CCC', 'digrin', TickerRecord('CCC', stock_price=20.0))
+    journal.close()
+
+    resumed = CheckpointJournal(journal_path, resume=True)
+    assert set(resumed.completed()) == {'AAA'}
+    assert resumed.completed()['AAA'].dgr5 == 0.05
+    assert set(resumed.missing_digrin()) == {'CCC'}
+    assert resumed.missing_digrin()['CCC'].stock_price == 20.0
+    resumed.close()
+
+
+def test_last_line_of_a_ticker_wins(journal_path):
+    journal = CheckpointJournal(journal_path)
+    journal.record_failed('AAA', 'digrin', TickerRecord('AAA'))
+    journal.record_done(TickerRecord('AAA', dgr3=0.1))
+    journal.close()
+
+    resumed = CheckpointJournal(journal_path, resume=True)
+    assert set(resumed.completed()) == {'AAA'}
+    assert resumed.missing_digrin() == {}
+    resumed.close()
+
+
+def test_half_written_line_is_skipped(journal_path):
+    journal = CheckpointJournal(journal_path)
+    journal.record_done(TickerRecord('AAA'))
+    journal.close()
+    with open(journal_path, 'a', encoding='utf-8') as file:
+        file.write(json.dumps({'ticker': 'BBB', 'status': 'done'})[:20])
+
+    resumed = CheckpointJournal(journal_path, resume=True)
+    assert set(resumed.completed()) == {'AAA'}
+    resumed.close()
+
+
+def test_new_run_starts_an_empty_journal(journal_path):
+    journal = CheckpointJournal(journal_path)
+    journal.record_done(TickerRecord('AAA'))
+    journal.close()
+
+    fresh = CheckpointJournal(journal_path)
+    fresh.close()
+    assert CheckpointJournal(journal_path, resume=True).completed() == {}
+
+
+@pytest.mark.parametrize('streaming', [True, False])
+def test_resumed_run_only_fetches_what_is_missing(offline, tickers, monkeypatch, streaming):
+    monkeypatch.setattr(MainScraper, 'STREAMING_PIPELINE', streaming)
+    monkeypatch.setattr(MainScraper, 'BULK_SCREENER', False)
+    symbols = tickers('dividend', 4)
+    failing = symbols[1]
+    get_digrin_data = MainScraper.get_digrin_data
+    monkeypatch.setattr(MainScraper, 'get_digrin_data',
+                        lambda ticker: None if ticker == failing else get_digrin_data(ticker))
+
+    first = ListSink()
+    MainScraper.run(symbols, [first])
+    assert [record.ticker for record in first.records] == symbols
+    history = HistoryStore()
+    assert {row['Ticker'] for row in history.latest_per_ticker()} == set(symbols)
+    rows_before = {ticker: len(history.time_series(ticker)) for ticker in symbols}
+    history.close()
+
+    monkeypatch.setattr(MainScraper, 'get_digrin_data', get_digrin_data)
+    requests_before = offline.requests
+    second = ListSink()
+    MainScraper.run(symbols, [second], resume=True)
+
+    # Only the Digrin page of the failed ticker is requested again
+    assert offline.requests - requests_before == 1
+    assert [record.ticker for record in second.records] == symbols
+    for old, new in zip(first.records, second.records):
+        assert new.stock_price == old.stock_price
+    history = HistoryStore()
+    for ticker in symbols:
+        if ticker != failing:
+            assert len(history.time_series(ticker)) == rows_before[ticker]
+    latest = {row['Ticker']: row for row in history.latest_per_ticker()}
+    assert latest[failing]['Years Paying Dividends'] == second.records[1].years_paying_dividends == 41
+    history.close()
+
+
+def test_resume_builds_completed_records_once(offline, tickers, monkeypatch):
+    symbols = tickers('no_dividend', 3)
+    MainScraper.run(symbols, [ListSink()])
+
+    calls = []
+    completed = CheckpointJournal.completed
+    monkeypatch.setattr(CheckpointJournal, 'completed', lambda journal: calls.append(1) or completed(journal))
+    sink = ListSink()
+    MainScraper.run(symbols, [sink], resume=True)
+    assert len(calls) == 1
+    assert [record.ticker for record in sink.records] == symbols
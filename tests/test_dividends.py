@@ -0,0 +1,96 @@
+import math
+
+import pytest
+
+from dividendGrowth import annual_dividends, dividend_statistics, growth_rates
+from historyStore import DividendStore
+from scrapeDigrin import ingest_dividend_history
+
+
+def quarterly(amounts_per_year):
+    # Four equal payments per year, amounts_per_year is {year: annual total}
+    return [(f'{year}-{month:02d}-15', f'{year}-{month:02d}-30', total / 4)
+            for year, total in sorted(amounts_per_year.items()) for month in (2, 5, 8, 11)]
+
+
+def test_annual_totals():
+    first_year, totals = annual_dividends(quarterly({2010: 1.0, 2012: 2.0}))
+    assert first_year == 2010
+    assert list(totals) == [1.0, 0.0, 2.0]
+
+
+def test_steady_growth():
+    statistics = dividend_statistics(quarterly({year: 1.1 ** (year - 2000) for year in range(2000, 2021)}),
+                                     through_year=2020)
+    for window in (3, 5, 10, 20):
+        assert statistics[f'DGR{window}'] == pytest.approx(0.1)
+    assert statistics['CAGR'] == pytest.approx(0.1)
+    assert statistics['Growth Streak'] == 20
+    assert statistics['Years Paying Dividends'] == 21
+    assert statistics['Last Year'] == 2020
+    assert statistics['Annual Dividend'] == pytest.approx(1.1 ** 20, abs=1e-4)
+
+
+def test_short_history_has_no_long_windows():
+    statistics = dividend_statistics(quarterly({2018: 1.0, 2019: 1.0, 2020: 1.21}), through_year=2020)
+    assert statistics['DGR3'] != statistics['DGR3']
+    assert statistics['CAGR'] == pytest.approx(0.1)
+    assert statistics['Growth Streak'] == 1
+    assert statistics['Years Paying Dividends'] == 3
+
+
+def test_suspended_years_count_as_zero():
+    amounts = {year: 1.0 for year in range(2010, 2016)}
+    amounts.update({2018: 0.5, 2019: 0.6, 2020: 0.7})
+    statistics = dividend_statistics(quarterly(amounts), through_year=2020)
+    assert statistics['Years Paying Dividends'] == 3
+    assert statistics['Growth Streak'] == 3
+    # The window starts in a suspended year
+    assert math.isnan(statistics['DGR3'])
+    assert statistics['DGR5'] == pytest.approx(0.7 ** (1 / 5) - 1, abs=1e-4)
+
+
+def test_years_after_the_last_payment_count_up_to_through_year():
+    statistics = dividend_statistics(quarterly({2015: 1.0, 2016: 1.0, 2017: 1.0}), through_year=2020)
+    assert statistics['Last Year'] == 2020
+    assert statistics['Annual Dividend'] == 0
+    assert statistics['Years Paying Dividends'] == 0
+    assert statistics['Growth Streak'] == 0
+    assert statistics['DGR3'] == pytest.approx(-1)
+
+
+def test_years_after_through_year_are_ignored():
+    statistics = dividend_statistics(quarterly({2018: 1.0, 2019: 2.0, 2020: 0.5}), through_year=2019)
+    assert statistics['Last Year'] == 2019
+    assert statistics['Annual Dividend'] == 2.0
+    assert statistics['Growth Streak'] == 1
+
+
+def test_no_payments():
+    statistics = dividend_statistics([], through_year=2020)
+    assert statistics['Last Year'] is None
+    assert statistics['Years Paying Dividends'] == 0
+    assert all(math.isnan(statistics[f'DGR{window}']) for window in (3, 5, 10, 20))
+
+
+def test_growth_rates_per_year():
+    assert list(growth_rates([1.0, 2.0, 4.0], 1)) == [1.0, 1.0]
+    assert len(growth_rates([1.0, 2.0], 2)) == 0
+
+
+def test_ingest_only_adds_new_payments(offline, tickers):
+    ticker = tickers('dividend')[0]
+    store = DividendStore('dividends.sqlite')
+    added = ingest_dividend_history(ticker, store)
+    assert added and added == len(store.payments(ticker))
+    payments = store.payments(ticker)
+    assert payments == sorted(payments)
+
+    requests_before = offline.requests
+    assert ingest_dividend_history(ticker, store) == 0
+    assert offline.requests - requests_before == 1
+    assert store.payments(ticker) == payments
+
+    statistics = dividend_statistics(payments, through_year=int(payments[-1][0][:4]))
+    assert statistics['Years Paying Dividends'] >= 1
+    store.close()
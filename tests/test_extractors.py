@@ -0,0 +1,104 @@
+import re
+
+import pytest
+from bs4 import BeautifulSoup
+
+import MainScraper
+import scrapeDigrin
+import streamExtract
+from fixtureServer import FIXTURE_NAMES
+
+CHUNK_SIZES = [1, 7, 100, 8192]
+
+
+def baseline_finviz_text(soup, label):
+    # Lookup of the original get_valueFinviz: the snapshot cell after the label cell
+    label_element = soup.find('td', class_='snapshot-td2', string=label)
+    if label_element:
+        value_element = label_element.find_next('td', class_='snapshot-td2')
+        if value_element:
+            return value_element.get_text(strip=True)
+    return None
+
+
+def baseline_digrin_text(html, label):
+    # The original get_valueDigrin
+    match = re.compile(fr'{label}.*?>(.*?)<\/strong>', re.DOTALL).search(html)
+    if match:
+        return match.group(1).strip().replace('<strong>', '').replace('</strong>', '')
+    return 'N/A'
+
+
+def feed_in_chunks(parser, text, size):
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+        if parser.done:
+            break
+    else:
+        parser.close()
+    return parser
+
+
+@pytest.mark.parametrize('name', FIXTURE_NAMES)
+def test_snapshot_index_matches_baseline_lookup(finviz_pages, name):
+    soup = BeautifulSoup(finviz_pages[name], 'html.parser')
+    snapshot = MainScraper.build_snapshot_index(soup)
+    for label in MainScraper.SNAPSHOT_LABELS:
+        assert snapshot.get(label) == baseline_finviz_text(soup, label), label
+
+
+@pytest.mark.parametrize('name', FIXTURE_NAMES)
+def test_fast_and_full_parsers_agree(finviz_pages, name):
+    fast = MainScraper.parse_finviz_page('X', finviz_pages[name], 'fast')
+    full = MainScraper.parse_finviz_page('X', finviz_pages[name], 'full')
+    assert fast == full
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+@pytest.mark.parametrize('name', FIXTURE_NAMES)
+def test_stream_parser_matches_snapshot_index(finviz_pages, name, size):
+    expected = MainScraper.parse_finviz_page('X', finviz_pages[name], 'full')
+    parser = feed_in_chunks(streamExtract.SnapshotStreamParser(MainScraper.SNAPSHOT_LABELS), finviz_pages[name], size)
+    for label in MainScraper.SNAPSHOT_LABELS:
+        assert parser.snapshot.get(label) == expected.get(label), label
+
+
+@pytest.mark.parametrize('name', FIXTURE_NAMES)
+def test_digrin_values_match_baseline_regex(digrin_pages, name):
+    values = scrapeDigrin.extract_digrin_values(digrin_pages[name])
+    for label in scrapeDigrin.DIGRIN_LABELS:
+        assert values[label] == baseline_digrin_text(digrin_pages[name], label), label
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+@pytest.mark.parametrize('name', FIXTURE_NAMES)
+def test_digrin_stream_extractor_matches_full_page(digrin_pages, name, size):
+    extractor = feed_in_chunks(scrapeDigrin.DigrinStreamExtractor(), digrin_pages[name], size)
+    assert extractor.values() == scrapeDigrin.extract_digrin_values(digrin_pages[name])
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_dividend_table_is_chunk_size_independent(digrin_pages, size):
+    expected = feed_in_chunks(scrapeDigrin.DividendTableExtractor(), digrin_pages['dividend'], 10 ** 6).payments
+    extractor = feed_in_chunks(scrapeDigrin.DividendTableExtractor(), digrin_pages['dividend'], size)
+    assert extractor.payments == expected
+    assert expected and all(re.match(r'\d{4}-\d\d-\d\d$', ex_date) for ex_date, _, _ in expected)
+
+
+def test_dividend_table_stops_at_stored_payments(digrin_pages):
+    payments = feed_in_chunks(scrapeDigrin.DividendTableExtractor(), digrin_pages['dividend'], 10 ** 6).payments
+    since = payments[5][0]
+    extractor = scrapeDigrin.DividendTableExtractor(since)
+    extractor.feed(digrin_pages['dividend'])
+    assert extractor.done
+    # Newest first, down to and including the newest stored date
+    assert extractor.payments == [payment for payment in payments if payment[0] >= since]
+
+
+def test_stream_extract_matches_full_page(offline, tickers, finviz_pages):
+    ticker = tickers('dividend')[0]
+    url = MainScraper.FINVIZ_QUOTE_URL.format(ticker=ticker)
+    parser = streamExtract.stream_extract(url, streamExtract.SnapshotStreamParser(MainScraper.SNAPSHOT_LABELS))
+    expected = MainScraper.parse_finviz_page(ticker, finviz_pages['dividend'], 'full')
+    for label in MainScraper.SNAPSHOT_LABELS:
+        assert parser.snapshot.get(label) == expected.get(label), label
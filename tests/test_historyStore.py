@@ -0,0 +1,60 @@
+import math
+import sqlite3
+
+import historyStore
+from historyStore import HistoryStore
+from records import ALL_FIELDS, INTEGER_FIELDS, TickerRecord
+
+
+def test_schema_follows_the_record_fields(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite'))
+    columns = {row[1]: row[2] for row in store.connection.execute('PRAGMA table_info(scrapes)')}
+    store.close()
+    assert [column for column in columns if column not in ('ticker', 'scraped_at')] == [name for name, _ in ALL_FIELDS]
+    for name, _ in ALL_FIELDS:
+        assert columns[name] == ('INTEGER' if name in INTEGER_FIELDS else 'REAL')
+
+
+def test_records_round_trip(tmp_path):
+    record = TickerRecord('ABC', stock_price=17.65, dividend_yield=0.0629, shares_outstanding=7150000000.0,
+                          dgr5=0.05, years_paying_dividends=41, pe_ratio='N/A')
+    store = HistoryStore(str(tmp_path / 'history.sqlite'))
+    store.append([record], '2026-01-01T00:00:00+00:00')
+    row, = store.latest_per_ticker()
+    store.close()
+
+    assert row['Scraped At'] == '2026-01-01T00:00:00+00:00'
+    assert row['P/E'] is None
+    assert isinstance(row['Shares Outstanding'], int)
+    restored = TickerRecord.from_dict(row)
+    for name, _ in ALL_FIELDS:
+        original = getattr(record, name)
+        assert getattr(restored, name) == original or math.isnan(original) and math.isnan(getattr(restored, name))
+
+
+def test_latest_and_time_series(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite'))
+    for day, price in ((1, 10.0), (2, 11.0), (3, 12.0)):
+        store.append([TickerRecord('ABC', stock_price=price), TickerRecord('XYZ', stock_price=price * 2)],
+                     f'2026-01-0{day}T00:00:00+00:00')
+    assert [row['Stock Price'] for row in store.latest_per_ticker()] == [12.0, 24.0]
+    assert [row['Stock Price'] for row in store.time_series('ABC', start='2026-01-02')] == [11.0, 12.0]
+    assert [row['Stock Price'] for row in store.time_series('XYZ', end='2026-01-02T00:00:00+00:00')] == [20.0, 22.0]
+    store.close()
+
+
+def test_columns_of_new_fields_are_added_to_an_existing_table(tmp_path):
+    path = str(tmp_path / 'history.sqlite')
+    connection = sqlite3.connect(path)
+    # A table from before the Digrin fields existed
+    connection.execute('CREATE TABLE scrapes (ticker TEXT NOT NULL, scraped_at TEXT NOT NULL, stock_price REAL, '
+                       'PRIMARY KEY (ticker, scraped_at))')
+    connection.commit()
+    connection.close()
+
+    store = HistoryStore(path)
+    store.append([TickerRecord('ABC', stock_price=1.0, dgr20=0.1)])
+    row, = store.latest_per_ticker()
+    store.close()
+    assert row['DGR20'] == 0.1
+    assert historyStore.COLUMNS == [name for name, _ in ALL_FIELDS]
@@ -0,0 +1,75 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+import httpCache
+
+
+@pytest.fixture
+def cache(offline, tickers, monkeypatch):
+    # The offline fixture runs in an empty directory, so the cache starts empty
+    monkeypatch.setattr(httpCache, 'CACHE_ENABLED', True)
+    return offline.base_url + '/quote.ashx?t=' + tickers('dividend')[0]
+
+
+def test_fresh_page_is_served_without_a_request(cache, offline, finviz_pages):
+    first = httpCache.fetch(cache, ttl=60)
+    requests_before = offline.requests
+    second = httpCache.fetch(cache, ttl=60)
+    assert offline.requests == requests_before
+    assert not first.from_cache and second.from_cache
+    assert second.text == first.text == finviz_pages['dividend']
+
+
+def test_stale_page_is_revalidated_with_its_etag(cache, offline):
+    offline.etags = True
+    first = httpCache.fetch(cache, ttl=0)
+    assert first.meta['etag']
+    second = httpCache.fetch(cache, ttl=0)
+    assert offline.not_modified == 1
+    assert second.from_cache
+    assert second.text == first.text
+
+
+def test_stale_page_without_validators_is_downloaded_again(cache, offline):
+    calls = []
+
+    def parse(text):
+        calls.append(text)
+        return len(text)
+
+    first = httpCache.fetch(cache, ttl=0)
+    assert first.get_parsed('length', parse) == len(first.text)
+    requests_before = offline.requests
+    second = httpCache.fetch(cache, ttl=0)
+    assert offline.requests == requests_before + 1
+    assert not second.from_cache
+    # Same content, so the stored parse result is reused
+    assert second.get_parsed('length', parse) == len(first.text)
+    assert len(calls) == 1
+
+
+def test_host_ttl_applies_without_an_explicit_ttl(cache, offline, monkeypatch):
+    monkeypatch.setattr(httpCache, 'CACHE_TTL', {'127.0.0.1': 60})
+    httpCache.fetch(cache)
+    requests_before = offline.requests
+    assert httpCache.fetch(cache).from_cache
+    assert offline.requests == requests_before
+
+
+def test_error_status_raises_and_is_not_cached(cache, offline):
+    offline.queue_responses(404)
+    with pytest.raises(requests.HTTPError):
+        httpCache.fetch(cache, ttl=60)
+    assert httpCache.load_meta(cache) is None
+    assert not httpCache.fetch(cache, ttl=60).from_cache
+
+
+def test_concurrent_fetches_of_one_url(cache, finviz_pages):
+    with ThreadPoolExecutor(8) as executor:
+        pages = list(executor.map(lambda _: httpCache.fetch(cache, ttl=0), range(64)))
+    assert all(page.text == finviz_pages['dividend'] for page in pages)
+    assert not [name for name in os.listdir(httpCache.CACHE_DIR) if name.endswith('.tmp')]
+    assert httpCache.load_body(cache) == finviz_pages['dividend']
@@ -0,0 +1,85 @@
+import socket
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+import httpClient
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Record the waits between attempts instead of sleeping
+    waits = []
+    monkeypatch.setattr(httpClient.time, 'sleep', waits.append)
+    return waits
+
+
+@pytest.fixture
+def quote_url(offline, tickers):
+    return offline.base_url + '/quote.ashx?t=' + tickers('dividend')[0]
+
+
+def test_transient_statuses_are_retried(offline, quote_url, sleeps, finviz_pages):
+    offline.queue_responses(503, 502)
+    requests_before = offline.requests
+    response = httpClient.get(quote_url)
+    assert response.status_code == 200
+    assert response.text == finviz_pages['dividend']
+    assert offline.requests - requests_before == 3
+    assert len(sleeps) == 2
+
+
+def test_last_response_is_returned_after_max_retries(offline, quote_url, sleeps):
+    offline.queue_responses(*[503] * (httpClient.MAX_RETRIES + 1))
+    response = httpClient.get(quote_url)
+    assert response.status_code == 503
+    assert len(sleeps) == httpClient.MAX_RETRIES
+
+
+def test_client_errors_are_not_retried(offline, quote_url, sleeps):
+    offline.queue_responses(404)
+    assert httpClient.get(quote_url).status_code == 404
+    assert sleeps == []
+
+
+def test_retry_after_seconds_replace_the_backoff(offline, quote_url, sleeps):
+    offline.queue_responses(429, headers={'Retry-After': '7'})
+    assert httpClient.get(quote_url).status_code == 200
+    assert sleeps == [7.0]
+
+
+def test_retry_after_date(offline, quote_url, sleeps):
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    offline.queue_responses(503, headers={'Retry-After': format_datetime(retry_at, usegmt=True)})
+    assert httpClient.get(quote_url).status_code == 200
+    assert len(sleeps) == 1 and 25 <= sleeps[0] <= 30
+
+
+def test_invalid_retry_after_falls_back_to_backoff(offline, quote_url, sleeps):
+    offline.queue_responses(503, headers={'Retry-After': 'soon'})
+    assert httpClient.get(quote_url).status_code == 200
+    assert len(sleeps) == 1 and 0 <= sleeps[0] <= httpClient.BACKOFF_BASE
+
+
+def test_backoff_grows_and_is_capped():
+    for attempt in range(10):
+        delay = httpClient.backoff_delay(attempt)
+        assert 0 <= delay <= min(httpClient.BACKOFF_MAX, httpClient.BACKOFF_BASE * 2 ** attempt)
+
+
+def test_connection_errors_raise_after_max_retries(offline, sleeps):
+    # A port nobody listens on
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        port = unused.getsockname()[1]
+    with pytest.raises(requests.ConnectionError):
+        httpClient.get(f'http://127.0.0.1:{port}/quote.ashx?t=X')
+    assert len(sleeps) == httpClient.MAX_RETRIES
+
+
+def test_hedged_request_returns_the_page(offline, quote_url, finviz_pages):
+    response = httpClient.get(quote_url, hedge_after=0.0)
+    assert response.status_code == 200
+    assert response.text == finviz_pages['dividend']
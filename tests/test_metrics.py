@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+import MainScraper
+from metrics import Histogram, Metrics, metrics
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(bounds=(1, 2, 5))
+    for value in (0.5, 1.0, 1.5, 3.0, 10.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.count == 5
+    assert histogram.total == 16.0
+    assert histogram.quantile(0.4) == 1
+    assert histogram.quantile(0.5) == 2
+    assert histogram.quantile(0.99) == 10.0
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_quantile_is_capped_at_the_largest_value():
+    histogram = Histogram(bounds=(1, 2))
+    histogram.observe(1.2)
+    assert histogram.quantile(0.5) == 1.2
+
+
+def test_report():
+    registry = Metrics()
+    registry.observe('fetch', 0.2, source='finviz')
+    registry.observe('fetch', 0.4, source='finviz')
+    with registry.timer('parse', source='digrin'):
+        pass
+    registry.increment('bytes_downloaded', 100, host='a')
+    registry.increment('bytes_downloaded', 50, host='a')
+    registry.increment('retries', host='b')
+
+    report = registry.report()
+    json.dumps(report)
+    fetch = next(stage for stage in report['stages'] if stage['stage'] == 'fetch')
+    assert fetch['source'] == 'finviz'
+    assert fetch['count'] == 2
+    assert fetch['mean_seconds'] == pytest.approx(0.3)
+    assert fetch['max_seconds'] == 0.4
+    assert {stage['stage'] for stage in report['stages']} == {'fetch', 'parse'}
+    assert report['counters'] == [{'host': 'a', 'name': 'bytes_downloaded', 'value': 150},
+                                  {'host': 'b', 'name': 'retries', 'value': 1}]
+
+
+def test_prometheus_text():
+    registry = Metrics()
+    registry.observe('fetch', 0.003, source='finviz')
+    registry.increment('failures', source='say "hi"\n')
+    lines = registry.prometheus_text().splitlines()
+    assert '# TYPE scraper_stage_seconds histogram' in lines
+    assert 'scraper_stage_seconds_bucket{source="finviz",stage="fetch",le="0.0025"} 0' in lines
+    assert 'scraper_stage_seconds_bucket{source="finviz",stage="fetch",le="0.005"} 1' in lines
+    assert 'scraper_stage_seconds_bucket{source="finviz",stage="fetch",le="+Inf"} 1' in lines
+    assert 'scraper_stage_seconds_count{source="finviz",stage="fetch"} 1' in lines
+    assert '# TYPE scraper_failures_total counter' in lines
+    assert 'scraper_failures_total{source="say \\"hi\\"\\n"} 1' in lines
+
+
+def test_reset_forgets_everything():
+    registry = Metrics()
+    registry.observe('fetch', 1.0)
+    registry.increment('retries')
+    registry.reset()
+    assert registry.report()['stages'] == [] and registry.report()['counters'] == []
+
+
+def test_run_writes_the_report(offline, tickers, monkeypatch):
+    monkeypatch.setattr(MainScraper, 'CHECKPOINT_RUNS', False)
+    monkeypatch.setattr(MainScraper, 'RECORD_HISTORY', False)
+    metrics.reset()
+    MainScraper.run(tickers('dividend', 2), [])
+
+    with open(MainScraper.METRICS_JSON, encoding='utf-8') as file:
+        report = json.load(file)
+    counters = {(counter['name'], counter.get('host')): counter['value'] for counter in report['counters']}
+    assert counters[('bytes_downloaded', '127.0.0.1')] > 0
+    assert any(stage['stage'] == 'http_request' and stage['count'] == 4 for stage in report['stages'])
+    with open(MainScraper.METRICS_PROMETHEUS, encoding='utf-8') as file:
+        assert 'scraper_bytes_downloaded_total{host="127.0.0.1"}' in file.read()
@@ -0,0 +1,77 @@
+import random
+import threading
+import time
+
+import pytest
+
+from pipeline import run_pipeline
+
+
+def run_in_thread(*args, **kwargs):
+    # A pipeline that waits forever fails the test instead of hanging it
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = run_pipeline(*args, **kwargs)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), 'pipeline did not finish'
+    return outcome
+
+
+def jitter(value):
+    time.sleep(random.uniform(0, 0.002))
+    return value
+
+
+def test_results_reach_the_sink_in_order_and_in_chunks():
+    chunks = []
+    outcome = run_in_thread(range(200), [(jitter, 8), (lambda value: value * 2, 3)], chunks.append,
+                            chunk_size=16, max_in_flight=10)
+    assert outcome['result'] == 200
+    assert [value for chunk in chunks for value in chunk] == [value * 2 for value in range(200)]
+    assert all(len(chunk) == 16 for chunk in chunks[:-1])
+
+
+def test_none_results_are_dropped():
+    chunks = []
+    outcome = run_in_thread(range(50), [(lambda value: value if value % 3 else None, 4), (jitter, 2)],
+                            chunks.append, chunk_size=7)
+    assert outcome['result'] == len([value for value in range(50) if value % 3])
+    assert [value for chunk in chunks for value in chunk] == [value for value in range(50) if value % 3]
+
+
+def test_stage_exception_drops_only_its_item(capsys):
+    def fail_on_seven(value):
+        if value == 7:
+            raise ValueError('seven')
+        return value
+
+    chunks = []
+    outcome = run_in_thread(range(20), [(fail_on_seven, 4), (jitter, 2)], chunks.append, chunk_size=5)
+    assert outcome['result'] == 19
+    assert [value for chunk in chunks for value in chunk] == [value for value in range(20) if value != 7]
+    assert 'fail_on_seven failed. seven' in capsys.readouterr().out
+
+
+def test_source_exception_is_raised_after_earlier_items():
+    def source():
+        yield from range(30)
+        raise RuntimeError('source broke')
+
+    chunks = []
+    outcome = run_in_thread(source(), [(jitter, 4)], chunks.append, chunk_size=8, max_in_flight=4)
+    assert isinstance(outcome['error'], RuntimeError)
+    assert [value for chunk in chunks for value in chunk] == list(range(30))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 50])
+def test_empty_source(chunk_size):
+    chunks = []
+    assert run_in_thread([], [(jitter, 2)], chunks.append, chunk_size=chunk_size)['result'] == 0
+    assert chunks == []
@@ -0,0 +1,99 @@
+import pytest
+
+import httpClient
+import rateLimiter
+from rateLimiter import AdaptiveTokenBucket
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    clock = ManualClock()
+    limiter = AdaptiveTokenBucket('example.com', rate=2.0, min_rate=0.5, max_rate=10.0, burst=2)
+    limiter.clock = clock
+    limiter.updated = clock.now
+    waits = []
+    monkeypatch.setattr(rateLimiter.time, 'sleep', waits.append)
+    return limiter, clock, waits
+
+
+def test_burst_then_rate(bucket):
+    limiter, clock, waits = bucket
+    limiter.acquire()
+    limiter.acquire()
+    assert waits == []
+    limiter.acquire()
+    assert waits == [pytest.approx(0.5)]
+    clock.now += 10
+    # Idle time refills up to the burst only
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+
+def test_pause_holds_requests(bucket):
+    limiter, clock, waits = bucket
+    limiter.pause(5)
+    assert not limiter.try_acquire()
+    limiter.acquire()
+    assert waits == [pytest.approx(5)]
+
+
+def test_healthy_responses_raise_the_rate_up_to_max(bucket):
+    limiter, _, _ = bucket
+    limiter.record(200, 0.1)
+    assert limiter.rate == pytest.approx(2.0 + rateLimiter.INCREASE_STEP * 10.0)
+    for _ in range(1000):
+        limiter.record(200, 0.1)
+    assert limiter.rate == 10.0
+
+
+@pytest.mark.parametrize('status', [None, 403, 429, 500, 502, 503, 504])
+def test_unhealthy_responses_cut_the_rate(bucket, status):
+    limiter, _, _ = bucket
+    limiter.record(status, 0.1)
+    assert limiter.rate == 2.0 * rateLimiter.THROTTLE_DECREASE
+    for _ in range(20):
+        limiter.record(status, 0.1)
+    assert limiter.rate == 0.5
+
+
+def test_latency_spike_cuts_the_rate(bucket):
+    limiter, _, _ = bucket
+    limiter.record(200, 0.1)
+    rate = limiter.rate
+    limiter.record(200, 0.1 * rateLimiter.LATENCY_THRESHOLD * 1.5)
+    assert limiter.rate == pytest.approx(rate * rateLimiter.LATENCY_DECREASE)
+
+
+def test_client_errors_still_count_as_healthy(bucket):
+    limiter, _, _ = bucket
+    limiter.record(404, 0.1)
+    assert limiter.rate > 2.0
+
+
+def test_limiter_backs_off_on_server_errors(offline, tickers, monkeypatch):
+    monkeypatch.setattr(rateLimiter, 'RATE_LIMITS', {'127.0.0.1': {'rate': 50.0, 'min_rate': 1.0, 'max_rate': 100.0,
+                                                                  'burst': 50}})
+    monkeypatch.setattr(httpClient, 'BACKOFF_BASE', 0.001)
+    rateLimiter.reset()
+    url = offline.base_url + '/quote.ashx?t=' + tickers('dividend')[0]
+    limiter = rateLimiter.get_limiter('127.0.0.1')
+
+    # Every third response a 503, as from a struggling host
+    for _ in range(8):
+        offline.queue_responses(503)
+        assert httpClient.get(url).status_code == 200
+        assert httpClient.get(url).status_code == 200
+    assert limiter.rate < 50.0
+
+    rate = limiter.rate
+    for _ in range(5):
+        httpClient.get(url)
+    assert limiter.rate > rate
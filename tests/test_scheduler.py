@@ -0,0 +1,157 @@
+import time
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import httpCache
+import MainScraper
+import scheduler
+from historyStore import HistoryStore
+from records import DigrinRecord, TickerRecord
+from scrapeDigrin import get_digrin_data
+
+NOW = datetime(2026, 3, 2, 15, 0, tzinfo=timezone.utc).timestamp()
+
+
+class ListSink:
+    def __init__(self):
+        self.writes = []
+
+    def write(self, records):
+        self.writes.append([record.ticker for record in records])
+
+    def close(self):
+        pass
+
+
+def fetchers(finviz=None, digrin=None):
+    return {'finviz': (finviz or (lambda ticker: TickerRecord(ticker, stock_price=1.0)), 2),
+            'digrin': (digrin or (lambda ticker: DigrinRecord(dgr5=0.05)), 2)}
+
+
+def due_times(refresh):
+    return {(ticker, source): due for due, _, ticker, source in refresh.heap}
+
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite'))
+    yield store
+    store.close()
+
+
+def test_next_market_time():
+    new_york = ZoneInfo(scheduler.MARKET_TIMEZONE)
+    # Monday 10:00 is open, Monday 17:00 waits for Tuesday 9:30, Saturday for Monday 9:30
+    monday = datetime(2026, 3, 2, 10, 0, tzinfo=new_york)
+    assert scheduler.next_market_time(monday.timestamp()) == monday.timestamp()
+    assert scheduler.next_market_time(monday.replace(hour=17).timestamp()) == \
+        datetime(2026, 3, 3, 9, 30, tzinfo=new_york).timestamp()
+    assert scheduler.next_market_time(datetime(2026, 3, 7, 12, 0, tzinfo=new_york).timestamp()) == \
+        datetime(2026, 3, 9, 9, 30, tzinfo=new_york).timestamp()
+
+
+def test_everything_is_due_without_history():
+    refresh = scheduler.RefreshScheduler(['A', 'B'], [], fetchers(), market_hours=False)
+    assert set(due_times(refresh)) == {(ticker, source) for ticker in 'AB' for source in ('finviz', 'digrin')}
+    assert refresh.pop_due(float('inf')) == {'finviz': ['A', 'B'], 'digrin': ['A', 'B']}
+
+
+def test_due_times_are_seeded_per_source(history, monkeypatch):
+    monkeypatch.setattr(scheduler.time, 'time', lambda: NOW)
+    history.append([TickerRecord('A', stock_price=1.0, dgr5=0.05), TickerRecord('B', stock_price=2.0)],
+                   iso(NOW - 600))
+    history.mark_refreshed([('A', 'digrin')], iso(NOW - 3600))
+    refresh = scheduler.RefreshScheduler(['A', 'B', 'C'], [], fetchers(), intervals={'finviz': 900, 'digrin': 86400},
+                                         history=history, market_hours=False)
+    due = due_times(refresh)
+    assert due[('A', 'finviz')] == NOW - 600 + 900
+    assert due[('A', 'digrin')] == NOW - 3600 + 86400
+    assert due[('B', 'finviz')] == NOW - 600 + 900
+    # B has no Digrin data and C no history at all
+    assert due[('B', 'digrin')] == due[('C', 'finviz')] == due[('C', 'digrin')] == NOW
+    assert set(refresh.records) == {'A', 'B'}
+
+
+def test_history_rows_of_other_tickers_are_ignored(history):
+    history.append([TickerRecord('A', stock_price=1.0), TickerRecord('Z', stock_price=2.0)])
+    refresh = scheduler.RefreshScheduler(['A'], [], fetchers(), history=history, market_hours=False)
+    assert set(refresh.records) == {'A'}
+    assert {ticker for ticker, _ in due_times(refresh)} == {'A'}
+
+
+def test_batches_are_capped_per_source(monkeypatch):
+    monkeypatch.setattr(scheduler, 'BATCH_SIZE', 2)
+    refresh = scheduler.RefreshScheduler(list('ABCDE'), [], fetchers(), market_hours=False)
+    assert refresh.pop_due(float('inf')) == {'finviz': ['A', 'B'], 'digrin': ['A', 'B']}
+    assert refresh.pop_due(float('inf')) == {'finviz': ['C', 'D'], 'digrin': ['C', 'D']}
+    assert len(refresh.heap) == 2
+
+
+def test_run_once_reschedules_and_retries(history, monkeypatch):
+    monkeypatch.setattr(scheduler.time, 'time', lambda: NOW)
+    sink = ListSink()
+    refresh = scheduler.RefreshScheduler(
+        ['A', 'B'], [sink], fetchers(finviz=lambda ticker: None if ticker == 'B' else TickerRecord(ticker)),
+        intervals={'finviz': 900, 'digrin': 86400}, history=history, market_hours=False)
+    assert [record.ticker for record in refresh.run_once(NOW)] == ['A']
+    due = due_times(refresh)
+    assert due[('A', 'finviz')] == NOW + 900
+    assert due[('B', 'finviz')] == NOW + scheduler.RETRY_INTERVAL
+    assert due[('A', 'digrin')] == due[('B', 'digrin')] == NOW + 86400
+    # B's Digrin data waits for its Finviz data
+    assert sink.writes == [['A']]
+    assert 'B' in refresh.digrin_only
+    assert set(history.refresh_times()) == {('A', 'finviz'), ('A', 'digrin'), ('B', 'digrin')}
+    assert refresh.run_once(NOW + 60) == []
+
+
+def test_held_back_digrin_data_is_merged_with_finviz_data():
+    refresh = scheduler.RefreshScheduler(['A'], [], fetchers(), market_hours=False)
+    assert not refresh.update('A', 'digrin', DigrinRecord(dgr5=0.05))
+    assert refresh.update('A', 'finviz', TickerRecord('A', stock_price=1.0))
+    assert refresh.records['A'].dgr5 == 0.05
+    assert refresh.digrin_only == {}
+
+
+def test_market_hours_delay_finviz_only():
+    saturday = datetime(2026, 3, 7, 12, 0, tzinfo=ZoneInfo(scheduler.MARKET_TIMEZONE)).timestamp()
+    refresh = scheduler.RefreshScheduler([], [], fetchers())
+    assert refresh.next_due('finviz', saturday, 60) > saturday + 60
+    assert refresh.next_due('digrin', saturday, 60) == saturday + 60
+
+
+def test_scheduled_fetches_do_not_reuse_pages_older_than_the_interval(offline, tickers, monkeypatch):
+    monkeypatch.setattr(httpCache, 'CACHE_ENABLED', True)
+    monkeypatch.setattr(httpCache, 'CACHE_TTL', {'127.0.0.1': 3600})
+    symbols = tickers('dividend', 2)
+    refresh = scheduler.RefreshScheduler(
+        symbols, [], {'finviz': (MainScraper.fetch_financial_info, 2), 'digrin': (get_digrin_data, 2)},
+        intervals={'finviz': 0.5, 'digrin': 0.5}, market_hours=False)
+
+    requests_before = offline.requests
+    assert len(refresh.run_once()) == 2
+    assert offline.requests - requests_before == 4
+    # Within the cache TTL, but past the refresh interval
+    time.sleep(0.6)
+    assert len(refresh.run_once()) == 2
+    assert offline.requests - requests_before == 8
+    # Outside the scheduler the host TTL applies again
+    MainScraper.fetch_financial_info(symbols[0])
+    assert offline.requests - requests_before == 8
+
+
+def test_max_age_caps_the_ttl(offline, tickers, monkeypatch):
+    monkeypatch.setattr(httpCache, 'CACHE_ENABLED', True)
+    url = offline.base_url + '/quote.ashx?t=' + tickers('dividend')[0]
+    httpCache.fetch(url, ttl=3600)
+    with httpCache.max_age(3600):
+        assert httpCache.fetch(url, ttl=3600).from_cache
+        with httpCache.max_age(0):
+            assert not httpCache.fetch(url, ttl=3600).from_cache
+        assert httpCache.fetch(url, ttl=3600).from_cache
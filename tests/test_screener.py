@@ -0,0 +1,124 @@
+import hashlib
+
+import pytest
+
+import finvizScreener
+import httpCache
+import MainScraper
+from fixtureServer import fixture_name
+from records import TickerRecord
+
+# Columns of the v=152 view in FINVIZ_SCREENER_URL, as Finviz labels them, and the quote page label of each
+COLUMNS = [('Ticker', None), ('Market Cap', 'Market Cap'), ('P/E', 'P/E'), ('Fwd P/E', 'Forward P/E'),
+           ('Dividend', 'Dividend %'), ('EPS', 'EPS (ttm)'), ('Sales Q/Q', 'Sales Q/Q'),
+           ('Outstanding', 'Shs Outstand'), ('ROE', 'ROE'), ('Price', 'Price')]
+
+
+def screener_page(rows):
+    # rows: (ticker, quote page snapshot) pairs
+    header = ''.join(f'<th>{column}</th>' for column, _ in COLUMNS)
+    body = ''.join('<tr>' + ''.join(f'<td>{ticker if label is None else snapshot.get(label, "-")}</td>'
+                                    for _, label in COLUMNS) + '</tr>' for ticker, snapshot in rows)
+    return (f'<html><body><table><tr><td>Filters</td></tr></table>'
+            f'<table><tr>{header}</tr>{body}</table></body></html>')
+
+
+@pytest.fixture
+def quote_snapshots(finviz_pages):
+    return {name: MainScraper.parse_finviz_page('X', page, 'full') for name, page in finviz_pages.items()}
+
+
+@pytest.fixture
+def screener(offline, tickers, quote_snapshots, monkeypatch):
+    """
+    Answer screener requests with rows built from the recorded quote pages, leaving out
+    tickers in screener.missing. Quote pages still come from the fixture server.
+    """
+    class Screener:
+        requests = []
+        missing = set()
+
+    fetch = httpCache.fetch
+
+    def fetch_screener(url, headers=None, ttl=None):
+        if '/screener.ashx' not in url:
+            return fetch(url, headers, ttl)
+        requested = url.split('&t=')[1].split('&')[0].split(',')
+        Screener.requests.append(requested)
+        html = screener_page([(ticker, quote_snapshots[fixture_name(ticker)])
+                              for ticker in requested if ticker not in Screener.missing])
+        return httpCache.CachedResponse(url, html, hashlib.sha256(html.encode('utf-8')).hexdigest(), False)
+
+    monkeypatch.setattr(httpCache, 'fetch', fetch_screener)
+    monkeypatch.setattr(MainScraper, 'BULK_SCREENER', True)
+    return Screener
+
+
+def test_parse_screener_table(quote_snapshots):
+    html = screener_page([('abc', quote_snapshots['dividend']), ('XYZ', quote_snapshots['no_dividend'])])
+    table = finvizScreener.parse_screener_table(html)
+    assert list(table) == ['ABC', 'XYZ']
+    assert table['ABC']['Fwd P/E'] == '7.44'
+    assert table['XYZ']['Dividend'] == '-'
+    assert finvizScreener.parse_screener_table('<table><tr><td>No results</td></tr></table>') == {}
+
+
+def test_screener_snapshot_estimates_missing_labels(quote_snapshots):
+    for name in ('dividend', 'no_dividend'):
+        quote = quote_snapshots[name]
+        row = finvizScreener.parse_screener_table(screener_page([('ABC', quote)]))['ABC']
+        snapshot = finvizScreener.screener_snapshot(row)
+        # The estimates round to the quote page values for the recorded pages
+        assert {label: snapshot[label] for label in MainScraper.SNAPSHOT_LABELS} == \
+            {label: quote[label] for label in MainScraper.SNAPSHOT_LABELS}
+
+
+def test_screener_snapshot_leaves_out_what_it_cannot_derive(quote_snapshots):
+    row = finvizScreener.parse_screener_table(screener_page([('ABC', quote_snapshots['missing_fields'])]))['ABC']
+    snapshot = finvizScreener.screener_snapshot(row)
+    assert 'EPS next Y' not in snapshot
+    assert snapshot['Dividend'] == '0.40'
+
+
+def test_chunk_tickers():
+    assert list(finvizScreener.chunk_tickers(list('abcde'), 2)) == [['a', 'b'], ['c', 'd'], ['e']]
+
+
+def test_screener_replaces_quote_pages(screener, tickers, monkeypatch):
+    monkeypatch.setattr(finvizScreener, 'SCREENER_CHUNK_SIZE', 3)
+    symbols = tickers('dividend', 4) + tickers('no_dividend', 3)
+    items = list(MainScraper.iter_screener_items(symbols))
+    assert [len(chunk) for chunk in screener.requests] == [3, 3, 1]
+    assert all(isinstance(item, TickerRecord) for item in items)
+    assert [item.ticker for item in items] == symbols
+
+
+def test_uncovered_tickers_fall_back_to_their_quote_page(screener, tickers):
+    covered = tickers('dividend', 2)
+    incomplete = tickers('missing_fields')
+    absent = tickers('no_dividend')
+    screener.missing = set(absent)
+    symbols = [covered[0]] + incomplete + absent + [covered[1]]
+    items = list(MainScraper.iter_screener_items(symbols))
+    assert [item if isinstance(item, str) else item.ticker for item in items] == symbols
+    assert [isinstance(item, str) for item in items] == [False, True, True, False]
+
+
+def test_screener_records_match_quote_page_records(screener, tickers, offline):
+    symbols = tickers('dividend') + tickers('no_dividend')
+    from_screener = list(MainScraper.iter_screener_items(symbols))
+    requests_before = offline.requests
+    from_quotes = [MainScraper.fetch_financial_info(ticker) for ticker in symbols]
+    assert offline.requests - requests_before == len(symbols)
+    for screened, quoted in zip(from_screener, from_quotes):
+        assert screened.to_dict() == quoted.to_dict()
+
+
+def test_bulk_run_only_requests_uncovered_quote_pages(screener, tickers, offline):
+    symbols = tickers('dividend', 5) + tickers('missing_fields')
+    items = list(MainScraper.iter_ingestion_items(symbols, {}))
+    requests_before = offline.requests
+    records = [MainScraper.resolve_financial_info(item) for item in items]
+    assert len(screener.requests) == 1
+    assert offline.requests - requests_before == 1
+    assert [record.ticker for record in records] == symbols
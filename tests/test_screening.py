@@ -0,0 +1,93 @@
+import math
+import operator
+import random
+
+import pytest
+
+from records import ALL_FIELDS, TickerRecord
+from screening import INDEXED_FIELDS, ScreenIndex, parse_condition, parse_sort, screen
+
+OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+             '==': operator.eq, '!=': operator.ne}
+FIELDS = [name for name, _ in ALL_FIELDS]
+
+
+def random_records(generator, count):
+    records = []
+    for number in range(count):
+        # Few distinct values, so ties and == conditions are common, and a share of missing values
+        values = {name: generator.choice([None, 'N/A'] + [generator.randint(-5, 5) / 2 for _ in range(8)])
+                  for name in FIELDS}
+        records.append(TickerRecord(f'T{number}', **values))
+    return records
+
+
+def brute_force(records, where, sort, descending, top):
+    matches = [record for record in records
+               if all(not math.isnan(getattr(record, name)) and OPERATORS[op](getattr(record, name), value)
+                      for name, op, value in where)]
+    if sort:
+        present = [record for record in matches if not math.isnan(getattr(record, sort))]
+        missing = [record for record in matches if math.isnan(getattr(record, sort))]
+        # sorted is stable also with reverse=True, ties keep the original order
+        matches = sorted(present, key=lambda record: getattr(record, sort), reverse=descending) + missing
+    return matches[:top] if top is not None else matches
+
+
+def test_query_matches_brute_force():
+    generator = random.Random(24)
+    records = random_records(generator, 150)
+    index = ScreenIndex(records)
+    for _ in range(300):
+        where = [(generator.choice(INDEXED_FIELDS if generator.random() < 0.7 else FIELDS),
+                  generator.choice(list(OPERATORS)), generator.randint(-6, 6) / 2)
+                 for _ in range(generator.randint(0, 3))]
+        sort = generator.choice([None] + FIELDS)
+        descending = generator.random() < 0.5
+        top = generator.choice([None, 1, 5, 40])
+        expected = brute_force(records, where, sort, descending, top)
+        actual = index.query(where, sort, descending, top)
+        assert [record.ticker for record in actual] == [record.ticker for record in expected], (where, sort, descending, top)
+
+
+@pytest.mark.parametrize('top', [0, 1, 3, 500])
+def test_top_n_over_many_blocks(top):
+    generator = random.Random(top)
+    records = [TickerRecord(f'T{number}', dgr5=generator.random(), pe_ratio=generator.choice([5.0, 10.0, None]),
+                            dividend_yield=generator.random() / 10) for number in range(5000)]
+    index = ScreenIndex(records)
+    # Rare matches, so the scan needs several blocks of the order
+    where = [('dividend_yield', '>', 0.099), ('pe_ratio', '<', 8)]
+    for sort, descending in (('dgr5', True), ('dgr5', False), ('pe_ratio', False)):
+        expected = brute_force(records, where, sort, descending, top)
+        assert [record.ticker for record in index.query(where, sort, descending, top)] == \
+            [record.ticker for record in expected]
+
+
+def test_parse_condition():
+    assert parse_condition('Dividend Yield > 3%') == ('dividend_yield', '>', 0.03)
+    assert parse_condition('dgr5>=0.05') == ('dgr5', '>=', 0.05)
+    assert parse_condition('P/E = 20') == ('pe_ratio', '==', 20.0)
+    assert parse_condition(' price_difference < -.5 ') == ('price_difference', '<', -0.5)
+
+
+@pytest.mark.parametrize('text', ['Dividend Yield >', 'Yield > 3', 'P/E ~ 20'])
+def test_invalid_conditions(text):
+    with pytest.raises(ValueError):
+        parse_condition(text)
+
+
+def test_parse_sort():
+    assert parse_sort('-Price Difference') == ('price_difference', True)
+    assert parse_sort('dgr10') == ('dgr10', False)
+    with pytest.raises(ValueError):
+        parse_sort('-Market Cap')
+
+
+def test_screen_in_text_form():
+    records = [TickerRecord('A', dividend_yield=0.02, price_difference=0.1),
+               TickerRecord('B', dividend_yield=0.04, price_difference=0.3),
+               TickerRecord('C', dividend_yield=0.05, price_difference='N/A'),
+               TickerRecord('D', dividend_yield=0.06, price_difference=0.2)]
+    result = screen(records, ['Dividend Yield > 3%'], '-Price Difference', 2)
+    assert [record.ticker for record in result] == ['B', 'D']
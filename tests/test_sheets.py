@@ -0,0 +1,46 @@
+from sheetsGateway import diff_sheet_values, sheet_values_equal
+
+
+def test_unchanged_rows_give_no_ranges():
+    rows = [['ABBV', 150.5, 'N/A'], ['ADM', 60, 3]]
+    assert diff_sheet_values(rows, rows) == []
+
+
+def test_numbers_compare_by_value():
+    assert sheet_values_equal(3, 3.0)
+    assert sheet_values_equal('', None)
+    assert not sheet_values_equal('3', 4)
+
+
+def test_runs_of_changed_cells_become_one_range():
+    current = [['ABBV', 1, 2, 3, 4]]
+    new = [['ABBV', 1, 5, 6, 4]]
+    assert diff_sheet_values(current, new, first_row=2) == [{'range': 'C2:D2', 'values': [[5, 6]]}]
+
+
+def test_separate_runs_and_rows():
+    current = [['A', 1, 2, 3], ['B', 1, 2, 3]]
+    new = [['A', 9, 2, 9], ['B', 1, 2, 3], ['C', 1]]
+    assert diff_sheet_values(current, new) == [
+        {'range': 'B1:B1', 'values': [[9]]},
+        {'range': 'D1:D1', 'values': [[9]]},
+        {'range': 'A3:B3', 'values': [['C', 1]]},
+    ]
+
+
+def test_short_current_rows_count_as_empty_cells():
+    assert diff_sheet_values([['A']], [['A', '', 2]]) == [{'range': 'C1:C1', 'values': [[2]]}]
+
+
+def test_headers_wider_than_26_columns():
+    header = [f'Column {number}' for number in range(30)]
+    current = [header[:26]]
+    assert diff_sheet_values(current, [header]) == [{'range': 'AA1:AD1', 'values': [header[26:]]}]
+
+    changed = list(header)
+    changed[25] = 'Z changed'
+    changed[27] = 'AB changed'
+    assert diff_sheet_values([header], [changed]) == [
+        {'range': 'Z1:Z1', 'values': [['Z changed']]},
+        {'range': 'AB1:AB1', 'values': [['AB changed']]},
+    ]
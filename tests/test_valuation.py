@@ -0,0 +1,78 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from MainScraper import calculate_difference, calculate_discounted_cash_flow
+from records import RecordBatch, TickerRecord
+from valuation import fair_values, price_differences, sensitivity_grid, value_batch
+
+
+def random_inputs(generator, count):
+    def maybe_missing(value):
+        return 'N/A' if generator.random() < 0.2 else value
+
+    return [(maybe_missing(round(generator.uniform(-2, 10), 2)), maybe_missing(round(generator.uniform(-2, 10), 2)),
+             round(generator.uniform(0, 0.08), 4), generator.choice([0.005, round(generator.uniform(-0.2, 0.3), 3)]),
+             round(generator.uniform(1, 500), 2)) for _ in range(count)]
+
+
+def reference_fair_value(eps, forward_eps, dividend_yield, growth_rate, price):
+    try:
+        return round(calculate_discounted_cash_flow('X', None, eps, forward_eps, dividend_yield, growth_rate, price), 2)
+    except ZeroDivisionError:
+        return math.nan
+
+
+def test_fair_values_match_scalar_calculation():
+    inputs = random_inputs(random.Random(7), 500)
+    expected = [reference_fair_value(*row) for row in inputs]
+    actual = fair_values(*zip(*inputs))
+    assert any(math.isnan(value) for value in expected)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+
+
+def test_missing_yield_counts_as_no_dividend():
+    assert fair_values([2.0], [3.0], ['N/A'], [0.05], [100.0])[0] == round(100.0 / 1.005, 2)
+
+
+def test_price_differences_match_scalar_calculation():
+    fair_value = [120.0, 80.0, 50.0, 'N/A']
+    price = [100.0, 100.0, 0.0, 10.0]
+    differences = price_differences(fair_value, price)
+    assert list(differences[:2]) == [calculate_difference(120.0, 100.0), calculate_difference(80.0, 100.0)]
+    assert np.isnan(differences[2:]).all()
+
+
+def test_sensitivity_grid_cell_matches_fair_values():
+    inputs = random_inputs(random.Random(3), 50)
+    eps, forward_eps, dividend_yield, _, price = zip(*inputs)
+    discount_rates = [0.005, 0.08]
+    growth_rates = [-0.05, 0.02]
+    fair_value, _ = sensitivity_grid(eps, forward_eps, dividend_yield, price, discount_rates, growth_rates)
+    assert fair_value.shape == (2, 2, 50)
+    for d, discount_rate in enumerate(discount_rates):
+        for g, growth_rate in enumerate(growth_rates):
+            expected = fair_values(eps, forward_eps, dividend_yield, [growth_rate] * 50, price, discount_rate)
+            np.testing.assert_allclose(np.round(fair_value[d, g], 2), expected, rtol=0, atol=1e-9)
+
+
+def test_value_batch_matches_scalar_calculation():
+    inputs = random_inputs(random.Random(11), 200)
+    growth_rate = np.array([row[3] for row in inputs])
+    forward_eps = np.array([row[1] if row[1] != 'N/A' else np.nan for row in inputs])
+    batch = RecordBatch(TickerRecord(f'T{number}', eps_ttm=eps, dividend_yield=dividend_yield, stock_price=price)
+                        for number, (eps, _, dividend_yield, _, price) in enumerate(inputs))
+
+    fair_value, price_difference = value_batch(batch, growth_rate, forward_eps, update=True)
+    np.testing.assert_allclose(fair_value, [reference_fair_value(*row) for row in inputs], rtol=0, atol=1e-9)
+    for number, record in enumerate(batch):
+        assert record.fair_value == pytest.approx(fair_value[number], nan_ok=True)
+        assert record.price_difference == pytest.approx(price_difference[number], nan_ok=True)
+
+
+def test_value_batch_derives_forward_eps_from_forward_pe():
+    batch = RecordBatch([TickerRecord('A', stock_price=100.0, forward_pe=20.0, eps_ttm=4.0, dividend_yield=0.03)])
+    fair_value, _ = value_batch(batch, 0.02)
+    assert fair_value[0] == round(calculate_discounted_cash_flow('A', None, 4.0, 5.0, 0.03, 0.02, 100.0), 2)
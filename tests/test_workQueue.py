@@ -0,0 +1,136 @@
+import pytest
+
+import rateLimiter
+import workQueue
+from records import TickerRecord
+from workQueue import ShardJournal, SharedTokenBucket, WorkQueue
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / 'workqueue.sqlite')
+
+
+@pytest.fixture
+def queue(queue_path):
+    queue = WorkQueue(queue_path)
+    yield queue
+    queue.close()
+
+
+def test_shards_are_stable():
+    assert workQueue.shard_of('abbv') == workQueue.shard_of('ABBV')
+    assert all(0 <= workQueue.shard_of(f'T{number}', 4) < 4 for number in range(100))
+
+
+def test_every_shard_is_claimed_once(queue):
+    tickers = [f'T{number}' for number in range(40)]
+    queue.push(tickers, shard_count=4)
+    claimed = [queue.claim('one'), queue.claim('two')]
+    while claimed[-1] is not None:
+        claimed.append(queue.claim('three'))
+    assert sorted(claimed[:-1]) == sorted({workQueue.shard_of(ticker, 4) for ticker in tickers})
+    assert sorted(ticker for shard in claimed[:-1] for ticker in queue.tickers(shard)) == sorted(tickers)
+    assert queue.tickers(claimed[0]) == [ticker for ticker in tickers if workQueue.shard_of(ticker, 4) == claimed[0]]
+
+
+def test_expired_lease_is_claimed_again(queue, monkeypatch):
+    queue.push(['A'], shard_count=1)
+    shard = queue.claim('crashed')
+    assert queue.claim('other') is None
+    monkeypatch.setattr(workQueue, 'LEASE_SECONDS', -1)
+    assert queue.claim('other') == shard
+    queue.finish(shard)
+    assert queue.claim('third') is None
+    assert tuple(queue.progress()) == (1, 1)
+
+
+def test_heartbeat_keeps_the_lease(queue, monkeypatch):
+    queue.push(['A'], shard_count=1)
+    shard = queue.claim('worker')
+    monkeypatch.setattr(workQueue, 'LEASE_SECONDS', 60)
+    queue.heartbeat(shard)
+    assert queue.claim('other') is None
+
+
+def test_shard_journal_and_results(queue):
+    tickers = ['A', 'B', 'C', 'A']
+    queue.push(tickers, shard_count=1)
+    shard = queue.claim('worker')
+    journal = ShardJournal(queue, shard)
+    journal.record_done(TickerRecord('A', stock_price=1.0, dgr5=0.05))
+    journal.record_failed('B', 'finviz')
+    journal.record_failed('C', 'digrin', TickerRecord('C', stock_price=3.0))
+
+    assert set(journal.completed()) == {'A'}
+    assert journal.missing_digrin()['C'].stock_price == 3.0
+    records, failed = queue.results()
+    # Both copies of A share the outcome, B has no record
+    assert [record.ticker for record in records] == ['A', 'C', 'A']
+    assert failed == 2
+
+
+def test_collect_without_waiting(queue_path, queue):
+    queue.push(['A', 'B'], shard_count=1)
+    ShardJournal(queue, queue.claim('worker')).record_done(TickerRecord('B'))
+    records, failed = workQueue.collect(queue_path, wait=False)
+    assert [record.ticker for record in records] == ['B']
+    assert failed == 1
+
+
+def test_workers_scrape_every_shard(offline, tickers, queue_path):
+    symbols = tickers('dividend', 6) + tickers('no_dividend', 4)
+    queue = WorkQueue(queue_path)
+    queue.push(symbols, shard_count=3)
+    queue.close()
+
+    assert workQueue.run_worker(queue_path, 'one') == len({workQueue.shard_of(ticker, 3) for ticker in symbols})
+    assert workQueue.run_worker(queue_path, 'two') == 0
+    records, failed = workQueue.collect(queue_path)
+    assert [record.ticker for record in records] == symbols
+    assert failed == 0
+
+
+def test_worker_skips_tickers_a_previous_holder_finished(offline, tickers, queue_path, monkeypatch):
+    symbols = tickers('dividend', 3)
+    queue = WorkQueue(queue_path)
+    queue.push(symbols, shard_count=1)
+    shard = queue.claim('crashed')
+    ShardJournal(queue, shard).record_done(TickerRecord(symbols[0], stock_price=1.0))
+    queue.close()
+    monkeypatch.setattr(workQueue, 'LEASE_SECONDS', -1)
+
+    requests_before = offline.requests
+    assert workQueue.run_worker(queue_path, 'next') == 1
+    assert offline.requests - requests_before == 4
+    records, _ = workQueue.collect(queue_path)
+    assert [record.ticker for record in records] == symbols
+    assert records[0].stock_price == 1.0
+
+
+def test_shared_token_bucket_is_shared_between_instances(queue_path, monkeypatch):
+    waits = []
+    monkeypatch.setattr(rateLimiter.time, 'sleep', waits.append)
+    first = SharedTokenBucket(queue_path, 'example.com', rate=1.0, min_rate=0.5, max_rate=4.0, burst=2)
+    second = SharedTokenBucket(queue_path, 'example.com', rate=1.0, min_rate=0.5, max_rate=4.0, burst=2)
+
+    assert first.try_acquire() and second.try_acquire()
+    # The burst is spent for both
+    assert not first.try_acquire() and not second.try_acquire()
+    second.acquire()
+    assert len(waits) == 1 and 0.9 < waits[0] <= 1.0
+
+    first.record(503, 0.1)
+    with second.locked():
+        assert second.rate == 0.5
+    second.pause(30)
+    assert not first.try_acquire()
+
+
+def test_later_workers_continue_from_the_adapted_rate(queue_path):
+    first = SharedTokenBucket(queue_path, 'example.com', rate=1.0, min_rate=0.5, max_rate=4.0)
+    for _ in range(10):
+        first.record(200, 0.1)
+    later = SharedTokenBucket(queue_path, 'example.com', rate=1.0, min_rate=0.5, max_rate=4.0)
+    with later.locked():
+        assert later.rate == pytest.approx(1.0 + 10 * rateLimiter.INCREASE_STEP * 4.0)
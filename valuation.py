@@ -0,0 +1,145 @@
+import numpy as np
+
+# Same discount rate as calculate_discounted_cash_flow in MainScraper.py
+DISCOUNT_RATE = 0.005
+
+
+def to_array(values):
+    """
+    Convert a list of scraped values to a float array, with NaN for 'N/A' and other non-numeric values.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+        return values
+    return np.array([value if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+                     for value in values], dtype=float)
+
+
+def dividends_per_share(earnings_per_share, forward_earnings_per_share, dividend_yield):
+    # Forward EPS is preferred, then trailing EPS, then no dividend at all
+    earnings_per_share = to_array(earnings_per_share)
+    forward_earnings_per_share = to_array(forward_earnings_per_share)
+    # A missing yield counts as no dividend, as in fetch_financial_info
+    dividend_yield = np.nan_to_num(to_array(dividend_yield), nan=0.0)
+    return np.where(~np.isnan(forward_earnings_per_share), forward_earnings_per_share * dividend_yield,
+                    np.where(~np.isnan(earnings_per_share), earnings_per_share * dividend_yield, 0.0))
+
+
+def fair_values(earnings_per_share, forward_earnings_per_share, dividend_yield, growth_rate, current_price,
+                discount_rate=DISCOUNT_RATE):
+    """
+    Vectorized calculate_discounted_cash_flow for a whole universe of tickers.
+
+    Parameters:
+    - earnings_per_share, forward_earnings_per_share, dividend_yield, growth_rate, current_price:
+      One value per ticker, as lists (with 'N/A' allowed) or float arrays (with NaN).
+    - discount_rate (float or array): Discount rate, broadcast against the ticker arrays.
+
+    Returns:
+    - numpy.ndarray: Fair value per ticker rounded to 2 decimals. NaN where an input is missing
+      or where the discount rate equals the growth rate.
+    """
+    dividends = dividends_per_share(earnings_per_share, forward_earnings_per_share, dividend_yield)
+    growth_rate = to_array(growth_rate)
+    current_price = to_array(current_price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fair_value = dividends / (discount_rate - growth_rate) + current_price / (1 + discount_rate)
+    fair_value[~np.isfinite(fair_value)] = np.nan
+    return np.round(fair_value, 2)
+
+
+def price_differences(fair_value, stock_price):
+    """
+    Vectorized calculate_difference. NaN where the stock price is zero or missing.
+    """
+    fair_value = to_array(fair_value)
+    stock_price = to_array(stock_price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        difference = (fair_value - stock_price) / np.abs(stock_price)
+    difference[~np.isfinite(difference)] = np.nan
+    return np.round(difference, 4)
+
+
+def value_universe(earnings_per_share, forward_earnings_per_share, dividend_yield, growth_rate, current_price,
+                   discount_rate=DISCOUNT_RATE):
+    """
+    Compute fair value and price difference for every ticker in one call.
+
+    Returns:
+    - tuple: (fair_value, price_difference) arrays.
+    """
+    fair_value = fair_values(earnings_per_share, forward_earnings_per_share, dividend_yield, growth_rate,
+                             current_price, discount_rate)
+    return fair_value, price_differences(fair_value, current_price)
+
+
+def sensitivity_grid(earnings_per_share, forward_earnings_per_share, dividend_yield, current_price,
+                     discount_rates, growth_rates, dtype=np.float64):
+    """
+    Fair value and price difference for every combination of discount rate, growth rate and ticker.
+
+    The growth rate is the same for every ticker in a grid cell, so the scraped growth rate is not used.
+
+    Parameters:
+    - earnings_per_share, forward_earnings_per_share, dividend_yield, current_price: One value per ticker.
+    - discount_rates (array): D discount rates.
+    - growth_rates (array): G growth rates.
+    - dtype: Result type. float32 halves the memory of large grids.
+
+    Returns:
+    - tuple: (fair_value, price_difference) arrays of shape (D, G, N), not rounded.
+    """
+    dividends = dividends_per_share(earnings_per_share, forward_earnings_per_share, dividend_yield).astype(dtype)
+    current_price = to_array(current_price).astype(dtype)
+    discount_rates = np.asarray(discount_rates, dtype=dtype)
+    growth_rates = np.asarray(growth_rates, dtype=dtype)
+
+    # Build the result in place to keep only the two (D, G, N) arrays in memory
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spread = np.subtract.outer(discount_rates, growth_rates)
+        fair_value = np.empty((len(discount_rates), len(growth_rates), len(dividends)), dtype=dtype)
+        np.divide(dividends[np.newaxis, np.newaxis, :], spread[:, :, np.newaxis], out=fair_value)
+        fair_value += (current_price[np.newaxis, :] / (1 + discount_rates[:, np.newaxis]))[:, np.newaxis, :]
+        fair_value[~np.isfinite(fair_value)] = np.nan
+
+        price_difference = np.subtract(fair_value, current_price, dtype=dtype)
+        price_difference /= np.abs(current_price)
+        price_difference[~np.isfinite(price_difference)] = np.nan
+    return fair_value, price_difference
+
+
+def batch_column(batch, name):
+    # float64 view of a records.RecordBatch column, without copying
+    return np.frombuffer(batch.columns[name], dtype=np.float64)
+
+
+def value_batch(batch, growth_rate, forward_earnings_per_share=None, discount_rate=DISCOUNT_RATE, update=False):
+    """
+    value_universe over the columns of a records.RecordBatch.
+
+    Records keep neither the growth rate nor the forward EPS that extract_financial_info used,
+    so the growth rate has to be passed in. Without forward_earnings_per_share the forward EPS
+    is derived as Price / Forward P/E, which matches Finviz's EPS next Y up to rounding.
+
+    Parameters:
+    - batch (RecordBatch): Records to value.
+    - growth_rate (float or array): Growth rate, one for all tickers or one per ticker.
+    - forward_earnings_per_share (array): Forward EPS per ticker, NaN where missing.
+    - discount_rate (float or array): Discount rate.
+    - update (bool): Also store the results in the batch's fair_value and price_difference columns.
+
+    Returns:
+    - tuple: (fair_value, price_difference) arrays.
+    """
+    current_price = batch_column(batch, 'stock_price')
+    if forward_earnings_per_share is None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            forward_earnings_per_share = current_price / batch_column(batch, 'forward_pe')
+        forward_earnings_per_share[~np.isfinite(forward_earnings_per_share)] = np.nan
+    growth_rate = np.broadcast_to(np.asarray(growth_rate, dtype=float), current_price.shape)
+    fair_value, price_difference = value_universe(
+        batch_column(batch, 'eps_ttm'), to_array(forward_earnings_per_share), batch_column(batch, 'dividend_yield'),
+        growth_rate, current_price, discount_rate)
+    if update:
+        batch_column(batch, 'fair_value')[:] = fair_value
+        batch_column(batch, 'price_difference')[:] = price_difference
+    return fair_value, price_difference
@@ -0,0 +1,281 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import MainScraper
+import parsePool
+import pipeline
+import rateLimiter
+from records import TickerRecord
+
+QUEUE_DB = 'workqueue.sqlite'
+# Tickers are spread over this many shards. Every worker claims one shard at a time.
+SHARD_COUNT = 16
+# A claimed shard whose worker has not reported for this many seconds is given to another worker
+LEASE_SECONDS = 5 * 60
+# Seconds between progress checks of the coordinator
+POLL_INTERVAL = 2.0
+
+
+def shard_of(ticker, shard_count=SHARD_COUNT):
+    # crc32 is stable across processes and hosts, unlike hash()
+    return zlib.crc32(ticker.upper().encode('utf-8')) % shard_count
+
+
+def connect(path):
+    # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    return connection
+
+
+@contextmanager
+def transaction(connection):
+    # BEGIN IMMEDIATE takes the write lock up front, so two workers never read the same state
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield connection
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+class WorkQueue:
+    """
+    SQLite work queue of one sharded run, shared by a coordinator and any number of workers.
+
+    Every ticker is stored with its position in the ticker list and its shard. Workers claim
+    whole shards and write each ticker's outcome back in the same form as the checkpoint
+    journal: 'done' with the merged record, or 'failed' with the stage, and the Finviz
+    record when only Digrin failed. The coordinator reads the records back in ticker order.
+
+    Parameters:
+    - path (str): Database file. Workers on other hosts need it on a shared disk.
+    """
+
+    def __init__(self, path=QUEUE_DB):
+        self.path = path
+        self.connection = connect(path)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.connection.executescript(
+                'CREATE TABLE IF NOT EXISTS tasks (position INTEGER PRIMARY KEY, ticker TEXT NOT NULL, '
+                'shard INTEGER NOT NULL, status TEXT, stage TEXT, record TEXT);'
+                'CREATE INDEX IF NOT EXISTS tasks_shard_ticker ON tasks (shard, ticker);'
+                'CREATE TABLE IF NOT EXISTS shards (shard INTEGER PRIMARY KEY, worker TEXT, '
+                'heartbeat REAL, finished INTEGER NOT NULL DEFAULT 0);')
+
+    def push(self, tickers, shard_count=SHARD_COUNT):
+        """
+        Replace the queue with a new run over tickers.
+        """
+        with self.lock, transaction(self.connection):
+            self.connection.execute('DELETE FROM tasks')
+            self.connection.execute('DELETE FROM shards')
+            shards = [shard_of(ticker, shard_count) for ticker in tickers]
+            self.connection.executemany(
+                'INSERT INTO tasks (position, ticker, shard) VALUES (?, ?, ?)',
+                zip(range(len(tickers)), tickers, shards))
+            self.connection.executemany('INSERT INTO shards (shard) VALUES (?)', [(shard,) for shard in set(shards)])
+
+    def claim(self, worker):
+        """
+        Claim the next unfinished shard that nobody holds, or whose lease expired.
+
+        Returns:
+        - int: The shard, or None when no shard is left to claim.
+        """
+        now = time.time()
+        with self.lock, transaction(self.connection):
+            row = self.connection.execute(
+                'SELECT shard FROM shards WHERE finished = 0 AND (worker IS NULL OR heartbeat < ?) '
+                'ORDER BY shard LIMIT 1', (now - LEASE_SECONDS,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute('UPDATE shards SET worker = ?, heartbeat = ? WHERE shard = ?', (worker, now, row[0]))
+            return row[0]
+
+    def heartbeat(self, shard):
+        with self.lock:
+            self.connection.execute('UPDATE shards SET heartbeat = ? WHERE shard = ?', (time.time(), shard))
+
+    def finish(self, shard):
+        with self.lock:
+            self.connection.execute('UPDATE shards SET finished = 1, heartbeat = ? WHERE shard = ?', (time.time(), shard))
+
+    def tickers(self, shard):
+        with self.lock:
+            return [row[0] for row in self.connection.execute(
+                'SELECT ticker FROM tasks WHERE shard = ? ORDER BY position', (shard,))]
+
+    def entries(self, shard, condition):
+        with self.lock:
+            rows = self.connection.execute(
+                f'SELECT ticker, record FROM tasks WHERE shard = ? AND {condition}', (shard,)).fetchall()
+        return {ticker: TickerRecord.from_dict(json.loads(record)) for ticker, record in rows}
+
+    def update(self, shard, ticker, status, stage=None, record=None):
+        record = json.dumps(record.to_dict()) if record is not None else None
+        with self.lock:
+            # The shard index keeps this from scanning every task. Duplicates of a ticker share
+            # a shard, so they all get the same outcome.
+            self.connection.execute(
+                'UPDATE tasks SET status = ?, stage = ?, record = ? WHERE shard = ? AND ticker = ?',
+                (status, stage, record, shard, ticker))
+
+    def progress(self):
+        """
+        Return (finished shards, all shards).
+        """
+        with self.lock:
+            return self.connection.execute('SELECT SUM(finished), COUNT(*) FROM shards').fetchone()
+
+    def results(self):
+        """
+        Return the records of every ticker that has one, in ticker list order, and the number of failed tickers.
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT record, status FROM tasks ORDER BY position').fetchall()
+        records = [TickerRecord.from_dict(json.loads(record)) for record, _ in rows if record is not None]
+        return records, sum(status != 'done' for _, status in rows)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class ShardJournal:
+    """
+    Checkpoint journal view of one claimed shard, for MainScraper.journaled_stages.
+
+    Outcomes go straight to the queue and renew the shard's lease. Tickers a previous
+    holder of the shard finished are skipped, like a resumed run.
+    """
+
+    def __init__(self, queue, shard):
+        self.queue = queue
+        self.shard = shard
+
+    def completed(self):
+        return self.queue.entries(self.shard, "status = 'done'")
+
+    def missing_digrin(self):
+        return self.queue.entries(self.shard, "stage = 'digrin'")
+
+    def record_done(self, record):
+        self.queue.update(self.shard, record.ticker, 'done', record=record)
+        self.queue.heartbeat(self.shard)
+
+    def record_failed(self, ticker, stage, record=None):
+        self.queue.update(self.shard, ticker, 'failed', stage, record)
+        self.queue.heartbeat(self.shard)
+
+
+class SharedTokenBucket(rateLimiter.AdaptiveTokenBucket):
+    """
+    AdaptiveTokenBucket whose state lives in the queue database, so all workers on all hosts
+    together stay within the host's rate limit and back off together.
+
+    Every acquire, pause and record reads the bucket in a write transaction, applies the usual
+    update and stores it again. Times are wall clock times, so hosts need synchronized clocks.
+    """
+    clock = staticmethod(time.time)
+
+    def __init__(self, path, host, rate, min_rate, max_rate, burst=1):
+        super().__init__(host, rate, min_rate, max_rate, burst)
+        self.connection = connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limits (host TEXT PRIMARY KEY, rate REAL, tokens REAL, '
+            'updated REAL, paused_until REAL, average_latency REAL)')
+        # The first worker seeds the bucket. Later workers continue from the rate it has adapted to.
+        self.connection.execute('INSERT OR IGNORE INTO rate_limits VALUES (?, ?, ?, ?, ?, ?)',
+                                (host, self.rate, self.tokens, self.updated, self.paused_until, None))
+
+    @contextmanager
+    def locked(self):
+        with self.lock, transaction(self.connection):
+            (self.rate, self.tokens, self.updated, self.paused_until, self.average_latency) = self.connection.execute(
+                'SELECT rate, tokens, updated, paused_until, average_latency FROM rate_limits WHERE host = ?',
+                (self.host,)).fetchone()
+            yield
+            self.connection.execute(
+                'UPDATE rate_limits SET rate = ?, tokens = ?, updated = ?, paused_until = ?, average_latency = ? '
+                'WHERE host = ?',
+                (self.rate, self.tokens, self.updated, self.paused_until, self.average_latency, self.host))
+
+
+def install_shared_limiters(path):
+    # Replace the per-process limiter of every throttled host
+    for host, limits in rateLimiter.RATE_LIMITS.items():
+        rateLimiter.set_limiter(host, SharedTokenBucket(path, host, **limits))
+
+
+def run_worker(path=QUEUE_DB, worker=None):
+    """
+    Claim shards and scrape their tickers until no shard is left.
+
+    Every shard runs through the Finviz and Digrin stages of the streaming pipeline.
+    Requests to throttled hosts share one rate limit with every other worker of the queue.
+
+    Parameters:
+    - path (str): Queue database.
+    - worker (str): Name shown in the shards table. Defaults to host:pid.
+
+    Returns:
+    - int: Number of shards this worker finished.
+    """
+    worker = worker or f'{socket.gethostname()}:{os.getpid()}'
+    queue = WorkQueue(path)
+    install_shared_limiters(path)
+    finished = 0
+    try:
+        while True:
+            shard = queue.claim(worker)
+            if shard is None:
+                break
+            journal = ShardJournal(queue, shard)
+            journaled, _, fetch, merge = MainScraper.journaled_stages(journal)
+            pipeline.run_pipeline(MainScraper.iter_ingestion_items(queue.tickers(shard), journaled), [
+                (fetch, MainScraper.FINVIZ_MAX_WORKERS),
+                (merge, MainScraper.DIGRIN_MAX_WORKERS),
+            ], lambda records: queue.heartbeat(shard), chunk_size=MainScraper.SHEETS_CHUNK_SIZE)
+            queue.finish(shard)
+            finished += 1
+    finally:
+        parsePool.shutdown()
+        queue.close()
+    return finished
+
+
+def collect(path=QUEUE_DB, wait=True):
+    """
+    Wait until every shard is finished and return the records in ticker list order.
+
+    Parameters:
+    - path (str): Queue database.
+    - wait (bool): Poll until the workers are done. Otherwise return what is there now.
+
+    Returns:
+    - (list of TickerRecord, int): The records and the number of tickers that failed.
+    """
+    queue = WorkQueue(path)
+    try:
+        reported = None
+        while wait:
+            done, total = queue.progress()
+            done = done or 0
+            if done == total:
+                break
+            if done != reported:
+                print(f"Waiting for workers: {done} of {total} shards finished")
+                reported = done
+            time.sleep(POLL_INTERVAL)
+        return queue.results()
+    finally:
+        queue.close()